@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from config import SEED
+from main import POLICIES, initial_mapping
+from models.chip import load_chip
+from models import kernels
+from models.thermal import (precompute_thermal_matrix, build_thermal_solver, getTSPD, global_TSPD_budget,
+                            dvfs_from_budget, throughput, predict_temps, getTSPD_batch, global_TSPD_budget_batch,
+                            dvfs_from_budget_batch, throughput_batch, predict_temps_batch)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Mappings per call in the *_batch kernel benchmarks.
+BATCH_SIZE = 64
+
+# Startup benchmark: wall time of a fresh interpreter importing each of
+# these, as every pool worker and short CLI call does; "python" is the bare
+# interpreter for reference and "first policy call" adds one run_Proposed,
+# i.e. building or loading the default chip's thermal state.
+STARTUP_MODULES = ["models.thermal", "models.policies", "main", "visualize_from_csv", "plot_analysis"]
+FIRST_CALL = "from main import initial_mapping, run_Proposed; run_Proposed(initial_mapping(26, 0))"
+
+# Chip used for each benchmarked size; None is the default 52-core chip.
+CHIP_SIZES = {
+    52: None,
+    256: os.path.join(BASE_DIR, "chips", "mesh_16x16.json"),
+    1024: os.path.join(BASE_DIR, "chips", "mesh_32x32_sparse.json")
+}
+
+def machine_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+    except ImportError:
+        scipy_version = None
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy_version,
+        "kernel_backend": kernels.backend(),
+        "git_commit": commit,
+        "argv": sys.argv[1:]
+    }
+
+def time_call(fn, repeats, setup=None):
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def time_subprocess(code, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+def run_startup_benchmarks(repeats):
+    results = []
+    print("startup")
+    cases = [("python", "pass")] + [(f"import {module}", f"import {module}") for module in STARTUP_MODULES]
+    cases.append(("first policy call", FIRST_CALL))
+    for name, code in cases:
+        try:
+            times = time_subprocess(code, repeats)
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.decode().strip().splitlines()[-1:] or ["failed"]
+            print(f"  {name:<48} skipped: {error[0]}")
+            continue
+        record(results, name, "startup", None, None, times)
+    return results
+
+def record(results, name, kind, cores, density, times):
+    entry = {
+        "name": name,
+        "kind": kind,
+        "cores": cores,
+        "density": density,
+        "repeats": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "times": times
+    }
+    results.append(entry)
+    label = name
+    if cores is not None:
+        label += f" [{cores} cores" + (f", density {density}]" if density is not None else "]")
+    print(f"  {label:<48} median {entry['median']*1e3:10.3f} ms   min {entry['min']*1e3:10.3f} ms")
+
+def run_benchmarks(sizes, densities, policies, repeats, policy_repeats, max_migs, seed):
+    results = []
+    # Keep JIT compilation (or loading it from the cache) out of the timings.
+    kernels.warm_up()
+    for cores in sizes:
+        chip = load_chip(CHIP_SIZES[cores])
+        if chip.num_cores != cores:
+            raise ValueError(f"Chip for size {cores} has {chip.num_cores} cores")
+        # Build (or load) the thermal state outside the timed sections.
+        chip.solver
+        print(f"{chip.name}: {cores} cores, {chip.thermal_mode} thermal solver")
+
+        # A cold build of the thermal state the chip actually uses: the dense
+        # inverse, or for sparse chips the sparse LU factorisation (which
+        # never goes through the thermal cache).
+        if chip.thermal_mode == "sparse":
+            record(results, "build_thermal_solver", "kernel", cores, None,
+                   time_call(lambda: build_thermal_solver(chip), repeats))
+        else:
+            record(results, "precompute_thermal_matrix", "kernel", cores, None,
+                   time_call(lambda: precompute_thermal_matrix(chip), repeats))
+
+        for density in densities:
+            n_active = min(max(2, round(density * cores)), cores - 1)
+            A = initial_mapping(n_active, 0, seed, cores)
+            R = getTSPD(A, chip)
+            rho = global_TSPD_budget(R)
+            F = dvfs_from_budget(A, rho, chip)
+
+            record(results, "getTSPD", "kernel", cores, density, time_call(lambda: getTSPD(A, chip), repeats))
+            record(results, "dvfs_from_budget", "kernel", cores, density,
+                   time_call(lambda: dvfs_from_budget(A, rho, chip), repeats))
+            record(results, "throughput", "kernel", cores, density,
+                   time_call(lambda: throughput(A, F, chip), repeats))
+            record(results, "predict_temps", "kernel", cores, density,
+                   time_call(lambda: predict_temps(A, F, chip), repeats))
+            
+            A_batch = np.array([initial_mapping(n_active, k, seed, cores) for k in range(BATCH_SIZE)])
+            rho_batch = global_TSPD_budget_batch(getTSPD_batch(A_batch, chip))
+            F_batch = dvfs_from_budget_batch(A_batch, rho_batch, chip)
+            record(results, "dvfs_from_budget_batch", "kernel", cores, density,
+                   time_call(lambda: dvfs_from_budget_batch(A_batch, rho_batch, chip), repeats))
+            record(results, "throughput_batch", "kernel", cores, density,
+                   time_call(lambda: throughput_batch(A_batch, F_batch, chip), repeats))
+            record(results, "predict_temps_batch", "kernel", cores, density,
+                   time_call(lambda: predict_temps_batch(A_batch, F_batch, chip), repeats))
+
+            for policy_name in policies:
+                policy = POLICIES[policy_name]
+                # Start every repeat from a cold mapping cache so repeats
+                # time the search, not cache hits.
+                times = time_call(lambda: policy(A[:], max_migs=max_migs, chip=chip), policy_repeats,
+                                  setup=chip.mapping_cache.clear)
+                record(results, f"run_{policy_name}", "policy", cores, density, times)
+    return results
+
+def result_key(entry):
+    return (entry["name"], entry["cores"], entry["density"])
+
+# Compares median times entry by entry. Anything more than `threshold`
+# slower than the baseline is a regression; the return value is the number
+# of regressions, so the command can gate CI through its exit code.
+def compare(baseline, current, threshold, min_time=1e-5):
+    base = {result_key(e): e for e in baseline["results"]}
+    cur = {result_key(e): e for e in current["results"]}
+
+    for field in ("hostname", "processor", "cpu_count", "numpy", "python", "kernel_backend"):
+        if baseline["metadata"].get(field) != current["metadata"].get(field):
+            print(f"warning: {field} differs ({baseline['metadata'].get(field)} vs "
+                  f"{current['metadata'].get(field)}); timings may not be comparable")
+
+    regressions = 0
+    print(f"{'benchmark':<48} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for key, entry in cur.items():
+        name, cores, density = key
+        label = name
+        if cores is not None:
+            label += f" [{cores}" + (f", {density}]" if density is not None else "]")
+        if key not in base:
+            print(f"{label:<48} {'-':>12} {entry['median']*1e3:12.3f}     new")
+            continue
+
+        old, new = base[key]["median"], entry["median"]
+        ratio = new / old if old > 0 else float("inf")
+        status = ""
+        if new > min_time and ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(f"{label:<48} {old*1e3:12.3f} {new*1e3:12.3f} {ratio:7.2f} {status}")
+
+    for key in base:
+        if key not in cur:
+            label = key[0] + (f" [{key[1]}, {key[2]}]" if key[1] is not None else "")
+            print(f"{label} missing from the current results")
+
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the thermal kernels and policies, or compare two runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and write a JSON result file")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(CHIP_SIZES), choices=list(CHIP_SIZES))
+    run.add_argument("--densities", type=float, nargs="+", default=[0.1, 0.5, 0.9],
+                     help="fractions of active cores")
+    run.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES))
+    run.add_argument("--repeats", type=int, default=5, help="repeats per kernel")
+    run.add_argument("--policy-repeats", type=int, default=1, help="repeats per policy")
+    run.add_argument("--startup-repeats", type=int, default=5,
+                     help="fresh-interpreter runs per startup benchmark (0 to skip them)")
+    run.add_argument("--max-migs", type=int, default=15)
+    run.add_argument("--seed", type=int, default=SEED)
+    run.add_argument("--output", default=None, help="result JSON (default: a new timestamped file)")
+    run.add_argument("--backend", choices=["auto", "numba", "numpy"], default=None,
+                     help="kernel backend (default: config.KERNEL_BACKEND)")
+
+    cmp = commands.add_parser("compare", help="flag regressions of a run against a baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.2,
+                     help="relative slowdown counted as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    output_file = args.output
+    if output_file is None:
+        output_file = f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    if args.backend is not None:
+        kernels.set_backend(args.backend)
+    metadata = machine_metadata()
+    metadata["config"] = {
+        "sizes": args.sizes,
+        "densities": args.densities,
+        "repeats": args.repeats,
+        "policy_repeats": args.policy_repeats,
+        "startup_repeats": args.startup_repeats,
+        "max_migs": args.max_migs,
+        "seed": args.seed
+    }
+    results = run_startup_benchmarks(args.startup_repeats) if args.startup_repeats > 0 else []
+    results += run_benchmarks(args.sizes, args.densities, args.policies, args.repeats,
+                              args.policy_repeats, args.max_migs, args.seed)
+
+    with open(output_file, "w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+    print(f"Saved {len(results)} benchmarks to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import os
+
 NUM_CORES = 52
 NUM_TASKS_PER_CORE = 18
 NUM_ITERATION = 3
+SEED = 0
 
 GRID_W, GRID_H = 13, 4
 
@@ -8,10 +11,35 @@ T_DTM = 80.0
 T_AMB = 45.0
 
 
+# run_MultiObjective weighs the relative gain in rho (BETA), in throughput
+# (GAMMA) and the relative drop in temperature spread (DELTA), and charges
+# MIGRATION_COST per migration in the same units.
 BETA = 0.6
 GAMMA = 0.4
+DELTA = 0.2
+MIGRATION_COST = 0.01
 THRESH_MIG_GAIN = 0.01
+TSPD_CACHE_SIZE = 4096
+
+# Lumped per-core heat capacity for the transient model (models/transient.py);
+# with the conductances in B this gives time constants of ~10-100 ms.
+CORE_HEAT_CAPACITY = 0.03
+TRANSIENT_DT = 1e-3
 
 THERMAL_CONDUCTANCE_BASE = 0.5
 THERMAL_CONDUCTANCE_DECAY = 2.0
-AMBIENT_CONDUCTANCE = 0.1
\ No newline at end of file
+AMBIENT_CONDUCTANCE = 0.1
+
+# On-disk cache of B_inv/T_const shared across runs and processes; set to
+# None to always rebuild.
+THERMAL_CACHE_DIR = os.environ.get("THERMAL_CACHE_DIR",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), ".thermal_cache"))
+
+# Backend for the compiled TSPD/migration loops (models/kernels.py): "auto"
+# uses Numba when it is installed, "numba" asks for it (warning if it is
+# missing), "numpy" never uses it ("python" runs the loops uncompiled, for
+# checking them only). Compiled kernels are cached on disk in
+# KERNEL_CACHE_DIR; set it to None to use Numba's default location.
+KERNEL_BACKEND = os.environ.get("KERNEL_BACKEND", "auto")
+KERNEL_CACHE_DIR = os.environ.get("KERNEL_CACHE_DIR",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), ".numba_cache"))
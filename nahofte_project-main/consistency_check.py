@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import random
+import sys
+from itertools import combinations, product
+from types import SimpleNamespace
+import numpy as np
+from config import SEED, T_DTM
+from main import POLICIES, initial_mapping
+from models.cache import mapping_key
+from models.chip import load_chip
+from models import kernels
+from models.mapping_state import MappingState
+from models import exact
+
+# Checks that the incremental and batched code paths agree with the plain
+# definitions they replace. Every check prints its mismatches and a summary
+# line; the script exits 1 if any check found a mismatch.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHIPS = [None, os.path.join(BASE_DIR, "chips", "mesh_6x4.json"), os.path.join(BASE_DIR, "chips", "mesh_16x16.json")]
+# Uncompiled loop kernels take minutes per policy run on the 256-core chip.
+KERNEL_CHIPS = CHIPS[:2]
+
+# Same-type (active, idle) pairs, by source and then destination id, from
+# the full active x idle type comparison.
+def reference_pairs(A, chip):
+    A = np.asarray(A)
+    actives = np.flatnonzero(A == 1)
+    idles = np.flatnonzero(A == 0)
+    rows, cols = np.nonzero(chip.type_id[actives][:, None] == chip.type_id[idles][None, :])
+    return list(zip(actives[rows].tolist(), idles[cols].tolist()))
+
+# Random migrations, activations and deactivations applied to a
+# MappingState, with pairs() and key compared against the mapping rebuilt
+# from scratch after every update.
+def check_mapping_state(chip_paths, mappings, steps, seed):
+    rng = random.Random(seed)
+    checked, mismatches = 0, 0
+    for path in chip_paths:
+        chip = load_chip(path)
+        for _ in range(mappings):
+            A = [int(rng.random() < rng.random()) for _ in range(chip.num_cores)]
+            mapping = MappingState(A, chip)
+            for step in range(steps):
+                src, dst = mapping.pairs()
+                pairs = list(zip(src.tolist(), dst.tolist()))
+                checked += 1
+                if pairs != reference_pairs(A, chip) or mapping.key != mapping_key(A):
+                    mismatches += 1
+                    print(f"  {chip.name}: mismatch after {step} updates of {A}")
+                    break
+
+                move = rng.random()
+                if move < 0.6 and pairs:
+                    s, d = rng.choice(pairs)
+                    mapping.apply_migration(s, d)
+                    A[s], A[d] = 0, 1
+                else:
+                    core = rng.randrange(chip.num_cores)
+                    if A[core]:
+                        mapping.deactivate(core)
+                    else:
+                        mapping.activate(core)
+                    A[core] = 1 - A[core]
+    print(f"mapping: {checked} states checked, {mismatches} mismatches")
+    return mismatches
+
+# Regression set for policy outputs: every policy from a few initial
+# mappings per chip, keyed "chip/n_active/sample_id/policy". Recording it
+# with one tree and comparing with another shows whether a change moved any
+# decision (migration sequence) or result (rho, throughput beyond
+# rounding).
+def policy_outputs(chip_paths, policies, samples, seed, max_migs):
+    outputs = {}
+    for path in chip_paths:
+        chip = load_chip(path)
+        n = chip.num_cores
+        for n_active in sorted({2, n // 4, n // 2, 3 * n // 4, n - 2}):
+            for sample_id in range(samples):
+                A0 = initial_mapping(n_active, sample_id, seed, n)
+                for name in policies:
+                    data = POLICIES[name](A0[:], max_migs=max_migs, chip=chip)
+                    outputs[f"{chip.name}/{n_active}/{sample_id}/{name}"] = {
+                        "rho": float(data["rho"]),
+                        "throughput": float(data["throughput"]),
+                        "migration_sequence": [[int(s), int(d)] for s, d in data["migration_sequence"]]
+                    }
+    return outputs
+
+# Runs only present on one side (e.g. a policy added since) are skipped.
+def compare_policy_outputs(baseline, outputs, rtol=1e-12, label="policies"):
+    common = sorted(set(baseline) & set(outputs))
+    mismatches = 0
+    for key in common:
+        old, new = baseline[key], outputs[key]
+        if (old["migration_sequence"] != new["migration_sequence"]
+                or not np.isclose(old["rho"], new["rho"], rtol=rtol, atol=0)
+                or not np.isclose(old["throughput"], new["throughput"], rtol=rtol, atol=0)):
+            mismatches += 1
+            print(f"  {key}: {old} -> {new}")
+    print(f"{label}: {len(common)} runs compared, {mismatches} mismatches")
+    return mismatches
+
+# The regression set once on the NumPy path and once on the loop kernels of
+# models/kernels.py: compiled if Numba is installed, otherwise as plain
+# Python, which checks the same code Numba would compile.
+def check_kernels(chip_paths, policies, samples, seed, max_migs):
+    previous = kernels.backend()
+    loops = "numba" if kernels.set_backend("auto") == "numba" else "python"
+    try:
+        kernels.set_backend("numpy")
+        reference = policy_outputs(chip_paths, policies, samples, seed, max_migs)
+        kernels.set_backend(loops)
+        outputs = policy_outputs(chip_paths, policies, samples, seed, max_migs)
+    finally:
+        kernels.set_backend(previous)
+    return compare_policy_outputs(reference, outputs, label=f"kernels ({loops} vs numpy)")
+
+# Branch and bound of models/exact.py against brute force on random
+# two-type problems whose B_inv has many negative entries and whose TSPD
+# numerators start close to zero, where an inadmissible bound would prune
+# the optimum. The shipped chips never get near that regime.
+def check_exact(problems, seed, num_cores=12):
+    rng = np.random.default_rng(seed)
+    half = num_cores // 2
+    type_id = np.repeat([0, 1], half)
+    counts = np.array([half // 2, half - half // 2 - 1])
+    placements = []
+    for picked in product(combinations(range(half), counts[0]), combinations(range(half, num_cores), counts[1])):
+        row = np.zeros(num_cores, dtype=bool)
+        row[list(picked[0] + picked[1])] = True
+        placements.append(row)
+    placements = np.array(placements)
+
+    mismatches = 0
+    for _ in range(problems):
+        chip = SimpleNamespace(
+            num_cores=num_cores, type_id=type_id, cores=SimpleNamespace(num_types=2),
+            B_inv=rng.normal(0.05, 0.3, (num_cores, num_cores)) + np.eye(num_cores),
+            idle_power=rng.uniform(0.5, 2.0, num_cores), active_weight=rng.uniform(0.5, 2.0, num_cores),
+            T_const=T_DTM - rng.uniform(0.2, 2.0, num_cores),
+            alpha=np.ones(num_cores), sum_task_time=np.ones(num_cores))
+        for objective in ("rho", "throughput"):
+            problem = exact.build_problem(chip, objective, leaf_size=2)
+            optimum = exact._evaluate_batch(problem, placements).max()
+            found = exact._solve_subtree((problem, counts, np.zeros(0, dtype=bool), -np.inf))[0]
+            if not np.isclose(found, optimum, rtol=1e-12, atol=0):
+                mismatches += 1
+                print(f"  {objective}: branch and bound {found}, brute force {optimum}")
+    print(f"exact: {2 * problems} searches checked, {mismatches} mismatches")
+    return mismatches
+
+CHECKS = ["mapping", "policies", "kernels", "exact"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check incremental and batched code paths against plain references.")
+    parser.add_argument("--checks", nargs="+", choices=CHECKS, default=CHECKS, help="checks to run (default: all)")
+    parser.add_argument("--chips", nargs="+", default=CHIPS,
+                        help="chip description JSONs; 'default' is the 52-core chip")
+    parser.add_argument("--samples", type=int, default=20, help="random mappings per chip")
+    parser.add_argument("--steps", type=int, default=50, help="updates per mapping")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--kernel-chips", nargs="+", default=KERNEL_CHIPS,
+                        help="chips for the kernels check (default: the 52- and 24-core chips)")
+    parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES))
+    parser.add_argument("--policy-samples", type=int, default=2, help="initial mappings per chip and n_active")
+    parser.add_argument("--max-migs", type=int, default=15)
+    parser.add_argument("--record", default=None, help="write the policy outputs to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare the policy outputs with this JSON file")
+    args = parser.parse_args()
+
+    chip_paths = [None if path in (None, "default") else path for path in args.chips]
+    mismatches = 0
+    if "mapping" in args.checks:
+        mismatches += check_mapping_state(chip_paths, args.samples, args.steps, args.seed)
+    if "policies" in args.checks:
+        outputs = policy_outputs(chip_paths, args.policies, args.policy_samples, args.seed, args.max_migs)
+        if args.record is not None:
+            with open(args.record, "w") as f:
+                json.dump(outputs, f, indent=1)
+            print(f"policies: {len(outputs)} runs recorded to {args.record}")
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                mismatches += compare_policy_outputs(json.load(f), outputs)
+        elif args.record is None:
+            print(f"policies: {len(outputs)} runs, no --baseline to compare with")
+    if "kernels" in args.checks:
+        kernel_chips = [None if path in (None, "default") else path for path in args.kernel_chips]
+        mismatches += check_kernels(kernel_chips, args.policies, args.policy_samples, args.seed, args.max_migs)
+    if "exact" in args.checks:
+        mismatches += check_exact(args.samples * 10, args.seed)
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import argparse
+import os
+from utils.result_store import csv_to_store, count_rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert result CSVs into columnar result stores.")
+    parser.add_argument("csv_files", nargs="+")
+    parser.add_argument("--output-dir", default=None,
+                        help="directory for the stores (default: next to each CSV)")
+    args = parser.parse_args()
+
+    for csv_file in args.csv_files:
+        base = os.path.splitext(os.path.basename(csv_file))[0] + ".results"
+        store = os.path.join(args.output_dir or os.path.dirname(csv_file), base)
+        if os.path.exists(store):
+            print(f"Skipping {csv_file}: {store} already exists")
+            continue
+        rows = csv_to_store(csv_file, store)
+        print(f"{csv_file} -> {store}: {rows} rows ({count_rows(store)} stored)")
+
+if __name__ == "__main__":
+    main()
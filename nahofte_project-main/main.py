@@ -1,69 +1,222 @@
-import copy
+import argparse
+import os
 import random
-from models.policies import run_Proposed, run_PdOracle, run_PerfOracle, run_HotCold
-from utils.csv_utils import save_results_csv
-from config import NUM_CORES, NUM_ITERATION
+from concurrent.futures import ProcessPoolExecutor
+from models.policies import run_Proposed, run_PdOracle, run_PerfOracle, run_HotCold, run_BeamSearch, run_MultiObjective
+from models.chip import load_chip
+from models import kernels
+from models.instrument import PolicyTrace, TRACE_FIELDNAMES, TRACE_COLUMNS
+from utils.csv_utils import FIELDNAMES, append_results_csv, append_jsonl, load_completed_keys
+from utils.result_store import (RESULT_SCHEMA, STATE_SCHEMA, ResultWriter, completed_keys, is_result_store,
+                                 state_store_path, check_sweep_params, load_sweep_params)
+from config import NUM_ITERATION, SEED
 from datetime import datetime
 import time
 
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-OUTPUT_FILE = f"results_policies_{timestamp}.csv"
-
-results_all = []
-start_time = time.time()
-
-for n_active in range(2, NUM_CORES):
-    progress = (n_active-1) / (NUM_CORES-2) * 100
-    elapsed_time = time.time() - start_time
-    estimated_total_time = elapsed_time / (progress/100) if progress > 0 else 0
-    remaining_time = estimated_total_time - elapsed_time
-    
-    print(f"Running {n_active} active cores ({progress:.1f}% complete)")
-    print(f"Elapsed: {elapsed_time/60:.1f} min, Estimated remaining: {remaining_time/60:.1f} min")
-    
-    for sample_id in range(NUM_ITERATION):
-        print(f"  Sample {sample_id+1}/{NUM_ITERATION}")
-        
-        try:
-            active_cores = random.sample(range(NUM_CORES), n_active)
-            A0 = [0] * NUM_CORES
-            
-            for i in active_cores:
-                A0[i] = 1
-
-            policies = {
-                "Proposed": run_Proposed,
-                "PdOracle": run_PdOracle,
-                "PerfOracle": run_PerfOracle,
-                "HotCold": run_HotCold
-            }
-            
-            for policy_name, policy_func in policies.items():
-                try:
-                    data = policy_func(copy.deepcopy(A0[:]))
-                    
-                    results_all.append({
-                        "n_active": n_active,
-                        "sample_id": sample_id,
-                        "policy": policy_name,
-                        "throughput": data["throughput"],
-                        "rho": data["rho"],
-                        "migrations": data["migrations"],
-                        "throughput_gain": data["throughput_gain"]
-                    })
-                    
-                    print(f"    {policy_name}: {data['throughput_gain']:.4f} gain, {data['migrations']} migs, rho: {data['rho']:.4f}")
-                    
-                except Exception as e:
-                    print(f"Error running {policy_name} for n_active={n_active}, sample_id={sample_id}: {e}")
-                    continue
-                
-        except Exception as e:
-            print(f"Error running policies for n_active={n_active}, sample_id={sample_id}: {e}")
-            continue
-
-save_results_csv(OUTPUT_FILE, results_all)
-
-total_time = time.time() - start_time
-print(f" Done. Results saved to {OUTPUT_FILE} with {len(results_all)} rows.")
-print(f"Total execution time: {total_time/60:.1f} minutes")
\ No newline at end of file
+POLICIES = {
+    "Proposed": run_Proposed,
+    "PdOracle": run_PdOracle,
+    "PerfOracle": run_PerfOracle,
+    "HotCold": run_HotCold,
+    "BeamSearch": run_BeamSearch,
+    "MultiObjective": run_MultiObjective
+}
+
+def initial_mapping(n_active, sample_id, seed=SEED, num_cores=None):
+    num_cores = num_cores or load_chip().num_cores
+    # Every (n_active, sample_id) draws from its own generator, so the
+    # mapping does not depend on which process runs it or in what order.
+    rng = random.Random(f"{seed}-{n_active}-{sample_id}")
+    active_cores = rng.sample(range(num_cores), n_active)
+    A0 = [0] * num_cores
+
+    for i in active_cores:
+        A0[i] = 1
+
+    return A0
+
+def iter_jobs(seed=SEED, chip_path=None, instrument=False, save_state=True):
+    for n_active in range(2, load_chip(chip_path).num_cores):
+        for sample_id in range(NUM_ITERATION):
+            for policy_name in POLICIES:
+                yield (n_active, sample_id, policy_name, seed, chip_path, instrument, save_state)
+
+def run_job(job):
+    n_active, sample_id, policy_name, seed, chip_path, instrument, save_state = job
+    trace = PolicyTrace() if instrument else None
+
+    try:
+        chip = load_chip(chip_path)
+        A0 = initial_mapping(n_active, sample_id, seed, chip.num_cores)
+        data = POLICIES[policy_name](A0, chip=chip, trace=trace)
+    except Exception as e:
+        print(f"Error running {policy_name} for n_active={n_active}, sample_id={sample_id}: {e}")
+        return None
+
+    row = {
+        "n_active": n_active,
+        "sample_id": sample_id,
+        "policy": policy_name,
+        "throughput": data["throughput"],
+        "rho": data["rho"],
+        "migrations": data["migrations"],
+        "throughput_gain": data["throughput_gain"]
+    }
+    if trace is not None:
+        row.update(trace.summary())
+        row["trace"] = trace.to_record()
+    if save_state:
+        row["state"] = {
+            "n_active": n_active,
+            "sample_id": sample_id,
+            "policy": policy_name,
+            "A0": A0,
+            "A": data["A"],
+            "F": data["F"]
+        }
+    return row
+
+# With instrument=True every row also gets the PolicyTrace columns, and with
+# a trace_file each run's full trace (steps, accepted migrations with
+# before/after rho) is appended to it as one JSON line. An output_file
+# ending in .results (or an existing directory) is written as a columnar
+# result store in chunks instead of a CSV.
+#
+# With save_state each run's initial and final mapping and final
+# frequencies go to the side store at state_store_path(output_file), so
+# heatmaps can be drawn later without re-running the policy. States are
+# written in chunks, so a killed sweep may be missing the last few even
+# though their result rows are in place; on resume those runs are repeated
+# (they are deterministic) and only their states are written.
+#
+# The seed and chip are recorded next to the output when it is started, and
+# resuming an output started with a different seed or chip raises
+# ValueError instead of mixing two sweeps in one file.
+def run_sweep(output_file, workers=1, seed=SEED, chip_path=None, instrument=False, trace_file=None,
+              save_state=True):
+    chip = load_chip(chip_path)
+    num_cores = chip.num_cores
+    instrument = instrument or trace_file is not None
+    fieldnames = FIELDNAMES + TRACE_FIELDNAMES if instrument else FIELDNAMES
+    store = is_result_store(output_file)
+    completed = completed_keys(output_file) if store else load_completed_keys(output_file)
+    if completed and load_sweep_params(output_file) is None:
+        print(f"Note: {output_file} predates recorded sweep parameters; assuming seed {seed} and chip {chip.name}")
+    check_sweep_params(output_file, {"seed": seed, "chip": chip.name, "num_cores": num_cores,
+                                     "chip_path": chip_path and os.path.abspath(chip_path)})
+    missing_state = set()
+    if save_state and completed:
+        missing_state = completed - completed_keys(state_store_path(output_file))
+    jobs = [job for job in iter_jobs(seed, chip_path, instrument, save_state)
+            if job[:3] not in completed or job[:3] in missing_state]
+    if completed:
+        print(f"Resuming {output_file}: {len(completed)} results already done, {len(jobs)} to go"
+              + (f" ({len(missing_state)} only for their stored state)" if missing_state else ""))
+
+    results_all = []
+    start_time = time.time()
+    current_n_active = None
+
+    def report(row):
+        nonlocal current_n_active
+        n_active = row["n_active"]
+        if n_active != current_n_active:
+            current_n_active = n_active
+            progress = (n_active-1) / (num_cores-2) * 100
+            elapsed_time = time.time() - start_time
+            estimated_total_time = elapsed_time / (progress/100) if progress > 0 else 0
+            remaining_time = estimated_total_time - elapsed_time
+
+            print(f"Running {n_active} active cores ({progress:.1f}% complete)")
+            print(f"Elapsed: {elapsed_time/60:.1f} min, Estimated remaining: {remaining_time/60:.1f} min")
+
+        print(f"    {row['policy']} (sample {row['sample_id']+1}/{NUM_ITERATION}): "
+              f"{row['throughput_gain']:.4f} gain, {row['migrations']} migs, rho: {row['rho']:.4f}")
+
+    writer = None
+    if store:
+        writer = ResultWriter(output_file, schema={**RESULT_SCHEMA, **TRACE_COLUMNS} if instrument else RESULT_SCHEMA)
+    state_writer = ResultWriter(state_store_path(output_file), schema=STATE_SCHEMA) if save_state else None
+    # Compile (or load) the optional Numba kernels once per process up front.
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=kernels.warm_up)
+    else:
+        executor = None
+        kernels.warm_up()
+    try:
+        if executor is not None:
+            # map() hands results back in submission order, so rows come out
+            # exactly as a serial run would produce them.
+            rows = executor.map(run_job, jobs, chunksize=len(POLICIES))
+        else:
+            rows = map(run_job, jobs)
+
+        for row in rows:
+            if row is None:
+                continue
+            record = row.pop("trace", None)
+            state = row.pop("state", None)
+            if state_writer is not None:
+                state_writer.append(state)
+            if (row["n_active"], row["sample_id"], row["policy"]) in completed:
+                continue
+            report(row)
+            if trace_file is not None:
+                append_jsonl(trace_file, [{"n_active": row["n_active"], "sample_id": row["sample_id"],
+                                           "policy": row["policy"], **record}])
+            if writer is not None:
+                writer.append(row)
+            else:
+                append_results_csv(output_file, [row], fieldnames)
+            results_all.append(row)
+    finally:
+        if writer is not None:
+            writer.close()
+        if state_writer is not None:
+            state_writer.close()
+        if executor is not None:
+            executor.shutdown()
+
+    return results_all
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep all migration policies over n_active and samples.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1, serial)")
+    parser.add_argument("--seed", type=int, default=SEED,
+                        help="master seed for the initial mappings (default: config.SEED)")
+    parser.add_argument("--chip", default=None,
+                        help="chip description JSON (default: the 52-core chip from config.py)")
+    parser.add_argument("--output", default=None,
+                        help="results CSV; rows already in it are skipped, new rows are appended "
+                             "(default: a new timestamped file)")
+    parser.add_argument("--format", choices=["csv", "store"], default="csv",
+                        help="format of the default output file; an --output ending in .results "
+                             "is always a columnar store")
+    parser.add_argument("--instrument", action="store_true",
+                        help="add decision-cost columns (call counts, candidates, phase times) to the CSV")
+    parser.add_argument("--trace", default=None,
+                        help="also append a per-run JSONL decision trace to this file (implies --instrument)")
+    parser.add_argument("--no-state", action="store_true",
+                        help="do not keep the initial/final mapping and frequencies of each run "
+                             "in the side store next to the output")
+    args = parser.parse_args()
+
+    output_file = args.output
+    if output_file is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = "results" if args.format == "store" else "csv"
+        output_file = f"results_policies_{timestamp}.{extension}"
+
+    start_time = time.time()
+    results_all = run_sweep(output_file, workers=args.workers, seed=args.seed, chip_path=args.chip,
+                            instrument=args.instrument, trace_file=args.trace, save_state=not args.no_state)
+
+    total_time = time.time() - start_time
+    print(f" Done. Results saved to {output_file} with {len(results_all)} new rows.")
+    print(f"Total execution time: {total_time/60:.1f} minutes")
+    if args.workers <= 1:
+        print(f"TSPD cache: {load_chip(args.chip).mapping_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+import numpy as np
+from config import TSPD_CACHE_SIZE
+
+def mapping_key(A):
+    bits = np.packbits(np.asarray(A) == 1, bitorder='little')
+    return int.from_bytes(bits.tobytes(), 'little')
+
+class MappingCache:
+    def __init__(self, maxsize=TSPD_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+    
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,132 @@
+import json
+from functools import lru_cache
+from config import GRID_W, GRID_H
+from data.core_types import CORE_TYPES, CORE_INFO
+from models.cache import MappingCache
+from models.core_table import CoreTable
+
+class Chip:
+    def __init__(self, grid_w, grid_h, core_types, core_info=None, name=None,
+                 thermal_mode="dense", coupling_tol=1e-4):
+        core_info = CORE_INFO if core_info is None else core_info
+        
+        if thermal_mode not in ("dense", "sparse"):
+            raise ValueError(f"Unknown thermal mode: {thermal_mode}")
+        
+        if len(core_types) != grid_w * grid_h:
+            raise ValueError(f"{len(core_types)} core types for a {grid_w}x{grid_h} grid")
+        unknown = sorted(set(core_types) - set(core_info))
+        if unknown:
+            raise ValueError(f"No core info for types: {', '.join(unknown)}")
+        
+        self.name = name or f"{grid_w}x{grid_h}"
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.num_cores = grid_w * grid_h
+        self.core_types = list(core_types)
+        self.core_info = core_info
+        # "dense" inverts the full coupling matrix B. "sparse" drops
+        # couplings below coupling_tol and solves with a cached sparse LU
+        # factorisation instead, for floorplans where N x N is too big.
+        self.thermal_mode = thermal_mode
+        self.coupling_tol = coupling_tol
+        
+        # Structure-of-arrays parameters; per_core is a list-of-dicts view
+        # of the same table for older callers.
+        self.cores = CoreTable(self.core_types, core_info)
+        self.per_core = self.cores.per_core
+        self.type_id = self.cores.type_id
+        self.alpha = self.cores.alpha
+        self.fmax = self.cores.fmax
+        self.p_idle = self.cores.p_idle
+        self.sum_task_time = self.cores.sum_task_time
+        
+        # Power terms used by the TSPD bound: idle cores leak 0.3*p_idle,
+        # active cores are charged 1.5*alpha per unit of power density.
+        self.idle_power = self.p_idle * 0.3
+        self.active_weight = self.alpha * 1.5
+        
+        self.mapping_cache = MappingCache()
+        self._engine = None
+    
+    def __repr__(self):
+        return f"Chip({self.name!r}, {self.grid_w}x{self.grid_h}, {self.num_cores} cores)"
+    
+    # Core types are laid out in core-id order, region after region, the way
+    # data.core_types.CORE_TYPES stacks 16 K6-III, 20 K6-2 and 16 PowerPC.
+    @classmethod
+    def from_regions(cls, grid_w, grid_h, regions, core_info=None, name=None, **options):
+        core_types = []
+        for core_type, count in regions:
+            core_types += [core_type] * count
+        return cls(grid_w, grid_h, core_types, core_info, name, **options)
+    
+    # Same type mix as the default 52-core chip, rescaled to any grid size.
+    @classmethod
+    def scaled(cls, grid_w, grid_h, core_info=None, name=None, **options):
+        mix = list(dict.fromkeys(CORE_TYPES))
+        shares = [CORE_TYPES.count(t) / len(CORE_TYPES) for t in mix]
+        num_cores = grid_w * grid_h
+        
+        counts = [int(round(share * num_cores)) for share in shares]
+        counts[-1] = num_cores - sum(counts[:-1])
+        return cls.from_regions(grid_w, grid_h, zip(mix, counts), core_info, name, **options)
+    
+    @classmethod
+    def from_dict(cls, spec):
+        core_info = dict(CORE_INFO)
+        core_info.update(spec.get("core_info", {}))
+        
+        grid_w, grid_h = spec["grid_w"], spec["grid_h"]
+        name = spec.get("name")
+        options = {key: spec[key] for key in ("thermal_mode", "coupling_tol") if key in spec}
+        if "core_types" in spec:
+            return cls(grid_w, grid_h, spec["core_types"], core_info, name, **options)
+        if "regions" in spec:
+            regions = [(region["type"], region["count"]) for region in spec["regions"]]
+            return cls.from_regions(grid_w, grid_h, regions, core_info, name, **options)
+        return cls.scaled(grid_w, grid_h, core_info, name, **options)
+    
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+    
+    def core_xy(self, cid):
+        return (cid % self.grid_w, cid // self.grid_w)
+    
+    def get_core_type(self, core_id):
+        return self.core_types[core_id]
+    
+    def same_type(self, i, j):
+        return self.type_id[i] == self.type_id[j]
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            # Deferred: models.thermal itself imports this module.
+            from models.thermal import ThermalEngine
+            self._engine = ThermalEngine(self)
+        return self._engine
+    
+    @property
+    def solver(self):
+        return self.engine.solver
+    
+    @property
+    def T_const(self):
+        return self.engine.T_const
+    
+    @property
+    def B_inv(self):
+        return self.engine.B_inv
+
+DEFAULT_CHIP = Chip(GRID_W, GRID_H, CORE_TYPES, CORE_INFO, name="default")
+
+# One Chip per description file per process, so pool workers that receive
+# only a path build (and invert) each floorplan once.
+@lru_cache(maxsize=None)
+def load_chip(path=None):
+    if path is None:
+        return DEFAULT_CHIP
+    return Chip.from_file(path)
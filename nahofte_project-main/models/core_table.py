@@ -0,0 +1,62 @@
+import numpy as np
+
+# Per-core parameters of a chip as one array per field (structure of
+# arrays), so kernels index or broadcast them directly instead of looking up
+# PER_CORE[i]["alpha"] in a loop. Core types are numbered in order of first
+# appearance: type_id[i] indexes type_keys, and two cores have the same type
+# exactly when their type ids are equal.
+class CoreTable:
+    FIELDS = ("fmax", "alpha", "p_idle", "sum_task_time")
+
+    def __init__(self, core_types, core_info):
+        self.type_keys = list(dict.fromkeys(core_types))
+        index = {key: t for t, key in enumerate(self.type_keys)}
+        self.type_id = np.array([index[key] for key in core_types], dtype=np.int64)
+        self.num_cores = len(self.type_id)
+        self.num_types = len(self.type_keys)
+
+        # Per-type parameters, gathered to per-core arrays once.
+        for field in self.FIELDS:
+            per_type = np.array([core_info[key][field] for key in self.type_keys], dtype=float)
+            setattr(self, field, per_type[self.type_id])
+
+        self.per_core = PerCoreView(self)
+
+    def __len__(self):
+        return self.num_cores
+
+    def type_of(self, core_id):
+        return self.type_keys[self.type_id[core_id]]
+
+    def same_type(self, i, j):
+        return self.type_id[i] == self.type_id[j]
+
+    def cores_of_type(self, t):
+        return np.flatnonzero(self.type_id == t)
+
+# Read-only list-of-dicts view of a CoreTable for code written against the
+# old PER_CORE: view[i] builds {"id", "type_key", "fmax", "alpha", "p_idle",
+# "sum_task_time"} on access, with plain Python values.
+class PerCoreView:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.num_cores
+
+    def __getitem__(self, core_id):
+        if isinstance(core_id, slice):
+            return [self[i] for i in range(*core_id.indices(len(self)))]
+        table = self.table
+        if core_id < 0:
+            core_id += table.num_cores
+        if not 0 <= core_id < table.num_cores:
+            raise IndexError("core id out of range")
+        core = {"id": core_id, "type_key": table.type_of(core_id)}
+        for field in table.FIELDS:
+            core[field] = getattr(table, field)[core_id].item()
+        return core
+
+    def __iter__(self):
+        for core_id in range(len(self)):
+            yield self[core_id]
@@ -0,0 +1,230 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
+import numpy as np
+from config import T_DTM
+from models.chip import DEFAULT_CHIP
+from models.thermal import tspd_from_terms, global_TSPD_budget_batch, evaluate_mapping
+from models.policies import run_PdOracle, run_PerfOracle
+
+# Exhaustive search grows as the product of binomials per type, so the
+# solver is meant for small chips only.
+MAX_EXACT_CORES = 32
+
+# Everything a subtree search needs, as plain arrays so it pickles cheaply
+# into worker processes. With a[i, j] = B_inv[i, j] * idle_power[j] and
+# b[i, j] = B_inv[i, j] * active_weight[j]:
+#   numerator_i   = base_i - sum_{j idle}   a[i, j]
+#   denominator_i =          sum_{j active} b[i, j]
+# Cores are decided in index order, so the undecided cores of a node are
+# always a suffix; the per-type sorted prefix sums cum_a/cum_b for every
+# suffix are precomputed for the bound.
+Problem = namedtuple("Problem", [
+    "a", "b", "base", "type_id", "num_types", "alpha", "sum_task_time", "objective",
+    "leaf_size", "cum_a", "cum_b", "suffix_count"
+])
+
+def build_problem(chip, objective="rho", leaf_size=8):
+    B_inv = np.asarray(chip.B_inv)
+    n = chip.num_cores
+    type_id = chip.type_id
+
+    a = B_inv * chip.idle_power[None, :]
+    b = B_inv * chip.active_weight[None, :]
+
+    cum_a, cum_b, suffix_count = [], [], []
+    for k in range(n + 1):
+        per_type_a, per_type_b, counts = [], [], []
+        for t in range(chip.cores.num_types):
+            cols = k + np.flatnonzero(type_id[k:] == t)
+            zeros = np.zeros((n, 1))
+            per_type_a.append(np.hstack([zeros, np.cumsum(np.sort(a[:, cols], axis=1), axis=1)]))
+            per_type_b.append(np.hstack([zeros, np.cumsum(np.sort(b[:, cols], axis=1), axis=1)]))
+            counts.append(len(cols))
+        cum_a.append(per_type_a)
+        cum_b.append(per_type_b)
+        suffix_count.append(counts)
+
+    return Problem(a, b, T_DTM - np.asarray(chip.T_const), type_id, chip.cores.num_types, chip.alpha,
+                   chip.sum_task_time, objective, leaf_size, cum_a, cum_b, suffix_count)
+
+# Throughput of core i at budget rho is F_i / (sum_task_time_i * fmax_i),
+# i.e. (min(rho, alpha_i) / alpha_i)**0.4 / sum_task_time_i.
+def _core_throughput(problem, rho):
+    alpha, stt = problem.alpha, problem.sum_task_time
+    rho = np.asarray(rho, dtype=float)[..., None]
+    out = np.zeros(rho.shape[:-1] + alpha.shape)
+    runs = (alpha > 0) & (stt > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(np.power(np.minimum(rho, alpha) / alpha, 0.4), stt, out=out, where=runs)
+    return out
+
+def _evaluate_batch(problem, active):
+    idle = (~active).astype(float)
+    numerator = problem.base - idle @ problem.a.T
+    denominator = active.astype(float) @ problem.b.T
+    rho = global_TSPD_budget_batch(tspd_from_terms(numerator, denominator, active))
+    if problem.objective == "rho":
+        return rho
+    return np.where(active, _core_throughput(problem, rho), 0.0).sum(axis=1)
+
+# Upper bound on the objective below a node. For every decided active core
+# i, deciding the remaining cores subtracts the a[i, j] of the undecided
+# cores that end up idle from the numerator and adds the b[i, j] of those
+# that end up active to the denominator, counts[t] - remaining[t] resp.
+# remaining[t] of them per type. B_inv has negative entries, so either term
+# can move both ways: the numerator is at most its value minus the smallest
+# such a[i, j] per type and at least its value minus the largest, and the
+# denominator at least its value plus the smallest b[i, j]. Only cores whose
+# numerator stays positive in every completion bound rho, since
+# global_TSPD_budget ignores cores with R <= 0 rather than returning 0.
+def _bound(problem, k, active, numerator, denominator, remaining):
+    counts = problem.suffix_count[k]
+    num_ub = numerator.copy()
+    num_lb = numerator.copy()
+    den_lb = denominator.copy()
+    for t in range(problem.num_types):
+        cum_a = problem.cum_a[k][t]
+        num_ub -= cum_a[:, counts[t] - remaining[t]]
+        num_lb -= cum_a[:, -1] - cum_a[:, remaining[t]]
+        den_lb += problem.cum_b[k][t][:, remaining[t]]
+
+    constraining = active & (num_lb > 0) & (den_lb > 1e-10)
+    rho_ub = float((num_ub[constraining] / den_lb[constraining]).min()) if constraining.any() else np.inf
+    if problem.objective == "rho":
+        return rho_ub
+
+    per_core = _core_throughput(problem, rho_ub)
+    bound = per_core[active].sum()
+    undecided = np.arange(len(active)) >= k
+    for t in range(problem.num_types):
+        if remaining[t]:
+            bound += np.sort(per_core[undecided & (problem.type_id == t)])[-remaining[t]:].sum()
+    return bound
+
+def _leaf_batch(problem, k, active, remaining):
+    n = len(active)
+    choices = []
+    for t in range(problem.num_types):
+        cols = k + np.flatnonzero(problem.type_id[k:] == t)
+        choices.append(list(combinations(cols.tolist(), int(remaining[t]))))
+
+    completions = list(product(*choices))
+    batch = np.tile(active, (len(completions), 1))
+    for row, picked in enumerate(completions):
+        for cols in picked:
+            batch[row, list(cols)] = True
+    return batch
+
+# Depth-first branch and bound below one node. stats collects nodes
+# explored (internal nodes plus evaluated leaves) and nodes pruned.
+def _search(problem, k, active, numerator, denominator, remaining, best, stats):
+    n = len(active)
+    if n - k <= problem.leaf_size:
+        batch = _leaf_batch(problem, k, active, remaining)
+        values = _evaluate_batch(problem, batch)
+        stats['explored'] += len(batch)
+        top = int(np.argmax(values))
+        if values[top] > best[0]:
+            best[0], best[1] = float(values[top]), batch[top].copy()
+        return
+
+    stats['explored'] += 1
+    if _bound(problem, k, active, numerator, denominator, remaining) <= best[0]:
+        stats['pruned'] += 1
+        return
+
+    t = problem.type_id[k]
+    if remaining[t] > 0:
+        active[k] = True
+        remaining[t] -= 1
+        _search(problem, k + 1, active, numerator, denominator + problem.b[:, k], remaining, best, stats)
+        remaining[t] += 1
+        active[k] = False
+    if problem.suffix_count[k + 1][t] >= remaining[t]:
+        _search(problem, k + 1, active, numerator - problem.a[:, k], denominator, remaining, best, stats)
+
+def _subtree_prefixes(problem, counts, depth):
+    prefixes = []
+    for bits in product((True, False), repeat=depth):
+        used = np.bincount(problem.type_id[:depth][list(bits)], minlength=problem.num_types)
+        left = np.array(problem.suffix_count[depth])
+        if (used <= counts).all() and (counts - used <= left).all():
+            prefixes.append(np.array(bits, dtype=bool))
+    return prefixes
+
+def _solve_subtree(job):
+    problem, counts, prefix, incumbent = job
+    n = len(problem.base)
+    depth = len(prefix)
+    active = np.zeros(n, dtype=bool)
+    active[:depth] = prefix
+
+    numerator = problem.base - problem.a[:, :depth] @ (~prefix).astype(float)
+    denominator = problem.b[:, :depth] @ prefix.astype(float)
+    remaining = counts - np.bincount(problem.type_id[:depth][prefix], minlength=problem.num_types)
+
+    best = [incumbent, None]
+    stats = {'explored': 0, 'pruned': 0}
+    _search(problem, depth, active, numerator, denominator, remaining, best, stats)
+    return best[0], best[1], stats
+
+# Finds the placement with the same number of active cores per type as A
+# that maximises rho (objective="rho") or throughput. The greedy oracle's
+# result seeds the incumbent; the tree is split into subtrees over the first
+# split_depth cores, searched serially (sharing the incumbent) or across a
+# process pool, with leaves of leaf_size undecided cores scored as a batch.
+def solve_exact(A, chip=None, objective="rho", workers=1, leaf_size=8, split_depth=4):
+    if objective not in ("rho", "throughput"):
+        raise ValueError(f"Unknown objective: {objective}")
+    chip = chip or DEFAULT_CHIP
+    if chip.num_cores > MAX_EXACT_CORES:
+        raise ValueError(f"Exact search is limited to {MAX_EXACT_CORES} cores, chip has {chip.num_cores}")
+
+    start = time.perf_counter()
+    problem = build_problem(chip, objective, leaf_size)
+    active = np.asarray(A) == 1
+    counts = np.bincount(problem.type_id[active], minlength=problem.num_types)
+
+    seed = (run_PdOracle if objective == "rho" else run_PerfOracle)(list(A), chip=chip)
+    seed_active = np.asarray(seed['A']) == 1
+    incumbent = float(_evaluate_batch(problem, seed_active[None, :])[0])
+    best_value, best_active = incumbent, seed_active
+
+    split_depth = max(0, min(split_depth, chip.num_cores - leaf_size))
+    prefixes = _subtree_prefixes(problem, counts, split_depth)
+    stats = {'explored': 0, 'pruned': 0, 'subtrees': len(prefixes)}
+
+    if workers > 1:
+        jobs = [(problem, counts, prefix, incumbent) for prefix in prefixes]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_solve_subtree, jobs))
+    else:
+        results = []
+        for prefix in prefixes:
+            results.append(_solve_subtree((problem, counts, prefix, best_value)))
+            if results[-1][1] is not None:
+                best_value, best_active = results[-1][0], results[-1][1]
+
+    for value, found, sub_stats in results:
+        stats['explored'] += sub_stats['explored']
+        stats['pruned'] += sub_stats['pruned']
+        if found is not None and value > best_value:
+            best_value, best_active = value, found
+
+    A_best = best_active.astype(int).tolist()
+    R, rho, F, tp = evaluate_mapping(A_best, chip)
+    return {
+        'A': A_best,
+        'F': F,
+        'rho': rho,
+        'throughput': tp,
+        'objective': objective,
+        'value': best_value,
+        'seed_value': incumbent,
+        'nodes_explored': stats['explored'],
+        'nodes_pruned': stats['pruned'],
+        'subtrees': stats['subtrees'],
+        'wall_time': time.perf_counter() - start
+    }
@@ -0,0 +1,94 @@
+import time
+
+# Extra result columns written for an instrumented sweep, with their types.
+TRACE_COLUMNS = {
+    'evaluate_calls': 'int64',
+    'tspd_calls': 'int64',
+    'predict_temps_calls': 'int64',
+    'candidates_scored': 'int64',
+    'steps': 'int64',
+    'time_setup': 'float64',
+    'time_candidates': 'float64',
+    'time_scoring': 'float64',
+    'time_commit': 'float64',
+    'time_total': 'float64'
+}
+TRACE_FIELDNAMES = list(TRACE_COLUMNS)
+
+# Decision-cost record for one policy run. Policies take it as trace=None
+# and only touch it behind `if trace is not None`, so an uninstrumented run
+# pays nothing beyond that check.
+#
+# Phases are timed by laps: lap(phase) books the time since the previous
+# lap (or begin()) to that phase, so the phases add up to the total.
+# tspd_calls counts full getTSPD evaluations, i.e. mapping-cache misses
+# during the run; incremental TSPDState scoring shows up in
+# candidates_scored instead.
+class PolicyTrace:
+    def __init__(self):
+        self.counters = {
+            'evaluate_calls': 0,
+            'tspd_calls': 0,
+            'predict_temps_calls': 0,
+            'candidates_scored': 0
+        }
+        self.phases = {'setup': 0.0, 'candidates': 0.0, 'scoring': 0.0, 'commit': 0.0}
+        self.candidates_per_step = []
+        self.migrations = []
+        self.total = 0.0
+        self._cache = None
+        self._misses = 0
+        self._start = self._last = None
+        self._step_candidates = 0
+
+    def begin(self, chip):
+        self._cache = chip.mapping_cache
+        self._misses = self._cache.misses
+        self._start = self._last = time.perf_counter()
+
+    # candidates adds to the number scored in the current step; end_step()
+    # closes the step.
+    def lap(self, phase, candidates=0):
+        now = time.perf_counter()
+        self.phases[phase] += now - self._last
+        self._last = now
+        self._step_candidates += candidates
+
+    def end_step(self):
+        self.candidates_per_step.append(int(self._step_candidates))
+        self.counters['candidates_scored'] += int(self._step_candidates)
+        self._step_candidates = 0
+
+    def count(self, name, k=1):
+        self.counters[name] += k
+
+    def accept(self, s, d, rho_before, rho_after):
+        self.migrations.append({
+            's': int(s),
+            'd': int(d),
+            'rho_before': float(rho_before),
+            'rho_after': float(rho_after)
+        })
+
+    # The final evaluation after the last step is booked to setup, like the
+    # initial one.
+    def end(self):
+        self.lap('setup')
+        self.total = self._last - self._start
+        self.counters['tspd_calls'] = self._cache.misses - self._misses
+
+    # Flat per-run values for TRACE_FIELDNAMES.
+    def summary(self):
+        row = dict(self.counters)
+        row['steps'] = len(self.candidates_per_step)
+        for phase, seconds in self.phases.items():
+            row[f'time_{phase}'] = seconds
+        row['time_total'] = self.total
+        return row
+
+    # Full record for the JSONL trace.
+    def to_record(self):
+        record = self.summary()
+        record['candidates_per_step'] = self.candidates_per_step
+        record['migration_trace'] = self.migrations
+        return record
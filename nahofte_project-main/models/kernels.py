@@ -0,0 +1,216 @@
+import warnings
+import numpy as np
+from config import KERNEL_BACKEND, KERNEL_CACHE_DIR
+
+# Optional compiled kernels for the loops that do not vectorise well:
+# getTSPD on a dense chip in one pass over B_inv, and scoring migration
+# candidates one by one with an early exit as soon as a candidate can no
+# longer win (PdOracle's best pair, Proposed's first improving pair,
+# HotCold's hottest/coldest core per type).
+#
+# The kernels below are plain loops over NumPy arrays. When Numba is
+# installed they are JIT-compiled on first use, with the machine code cached
+# on disk in KERNEL_CACHE_DIR so other processes and later runs load it
+# instead of compiling again. Without Numba, enabled() is False and callers
+# keep to their NumPy code. The candidate scores are bit-for-bit those of
+# the NumPy path; tspd_dense sums B_inv rows in a different order than BLAS
+# and so agrees with getTSPD only to rounding.
+#
+# The backend comes from config.KERNEL_BACKEND ("auto", "numba" or "numpy")
+# and can be changed at runtime with set_backend(). set_backend("python")
+# runs the same loops uncompiled, far slower, so they can be checked against
+# the NumPy path where Numba is not installed (consistency_check.py).
+
+_backend = None
+
+def _migration_rho(numerator, denominator, active, cols, slot, idle_power, active_weight, s, d, base, margin):
+    # rho after migrating s -> d (s < 0: activating d), from the per-core
+    # TSPD terms of the current mapping. Stops once rho - base <= margin,
+    # returning the partial minimum, which then also satisfies it.
+    n = len(numerator)
+    cd = slot[d]
+    cs = slot[s] if s >= 0 else 0
+    ip_d, aw_d = idle_power[d], active_weight[d]
+    ip_s = idle_power[s] if s >= 0 else 0.0
+    aw_s = active_weight[s] if s >= 0 else 0.0
+    best = np.inf
+    for i in range(n):
+        if i == s or (not active[i] and i != d):
+            continue
+        num = numerator[i] + cols[cd, i] * ip_d
+        den = denominator[i] + cols[cd, i] * aw_d
+        if s >= 0:
+            num = num - cols[cs, i] * ip_s
+            den = den - cols[cs, i] * aw_s
+        if den > 1e-10 and num > 0:
+            r = num / den
+            if 0 < r < best:
+                best = r
+                if best - base <= margin:
+                    return best
+    return 0.0 if best == np.inf else best
+
+def _score_pairs(numerator, denominator, active, cols, slot, idle_power, active_weight, src, dst):
+    rho = np.empty(len(dst))
+    for k in range(len(dst)):
+        rho[k] = _migration_rho(numerator, denominator, active, cols, slot, idle_power, active_weight,
+                                src[k], dst[k], 0.0, -np.inf)
+    return rho
+
+# Index and rho of the first best pair, like np.argmax over _score_pairs.
+def _best_pair(numerator, denominator, active, cols, slot, idle_power, active_weight, src, dst):
+    best_k, best = -1, -np.inf
+    for k in range(len(dst)):
+        r = _migration_rho(numerator, denominator, active, cols, slot, idle_power, active_weight,
+                           src[k], dst[k], 0.0, best)
+        if r > best:
+            best_k, best = k, r
+    return best_k, best
+
+# First (s, d) in S x D order, d of the same type as s, whose rho exceeds
+# rho0 by more than threshold. Returns (s, d, rho, candidates scored), or
+# s = d = -1 if there is none.
+def _first_improving(numerator, denominator, active, cols, slot, idle_power, active_weight, type_id,
+                     S, D, rho0, threshold):
+    scanned = 0
+    for s in S:
+        for d in D:
+            if type_id[d] != type_id[s]:
+                continue
+            scanned += 1
+            r = _migration_rho(numerator, denominator, active, cols, slot, idle_power, active_weight,
+                               s, d, rho0, threshold)
+            if r - rho0 > threshold:
+                return s, d, r, scanned
+    return -1, -1, 0.0, scanned
+
+# Hottest active and coldest idle core of every type, lowest id on ties;
+# -1 where a type has no active or no idle core.
+def _hot_cold_pairs(T, active, type_id, num_types):
+    hot = np.full(num_types, -1)
+    cold = np.full(num_types, -1)
+    for i in range(len(T)):
+        t = type_id[i]
+        if active[i]:
+            if hot[t] < 0 or T[i] > T[hot[t]]:
+                hot[t] = i
+        elif cold[t] < 0 or T[i] < T[cold[t]]:
+            cold[t] = i
+    return hot, cold
+
+def _tspd_dense(B_inv, base, idle_power, active_weight, active):
+    n = len(base)
+    R = np.empty(n)
+    for i in range(n):
+        if not active[i]:
+            R[i] = np.inf
+            continue
+        idle_sum, active_sum = 0.0, 0.0
+        for j in range(n):
+            if active[j]:
+                active_sum += B_inv[i, j] * active_weight[j]
+            else:
+                idle_sum += B_inv[i, j] * idle_power[j]
+        num = base[i] - idle_sum
+        R[i] = num / active_sum if active_sum > 1e-10 and num > 0 else 0.0
+    return R
+
+_KERNELS = ("_migration_rho", "_score_pairs", "_best_pair", "_first_improving", "_hot_cold_pairs", "_tspd_dense")
+
+def _compile():
+    import numba
+
+    # Numba reads NUMBA_CACHE_DIR when it is first imported, so the cache
+    # directory is set on its config instead.
+    if KERNEL_CACHE_DIR is not None:
+        numba.config.CACHE_DIR = KERNEL_CACHE_DIR
+    jit = numba.njit(cache=True, nogil=True)
+    # The helper is rebound first so the kernels calling it resolve the
+    # compiled version when they are compiled.
+    for name in _KERNELS:
+        globals()[name] = jit(globals()[name])
+
+def _uncompile():
+    for name in _KERNELS:
+        kernel = globals()[name]
+        globals()[name] = getattr(kernel, "py_func", kernel)
+
+def set_backend(name):
+    global _backend
+    if name not in ("auto", "numba", "numpy", "python"):
+        raise ValueError(f"Unknown kernel backend: {name}")
+    if name in ("numpy", "python"):
+        if name == "python":
+            _uncompile()
+        _backend = name
+        return _backend
+
+    try:
+        if not callable(getattr(_tspd_dense, "py_func", None)):
+            _compile()
+        _backend = "numba"
+    except ImportError:
+        if name == "numba":
+            warnings.warn("Numba is not installed; using the NumPy kernels")
+        _backend = "numpy"
+    return _backend
+
+def backend():
+    if _backend is None:
+        set_backend(KERNEL_BACKEND)
+    return _backend
+
+def enabled():
+    return backend() in ("numba", "python")
+
+# Compiles (or loads from the on-disk cache) every kernel by running it once
+# on a two-core problem with the argument types the callers use, so the
+# first real call does not pay for it. Pool workers run this as their
+# initializer.
+def warm_up():
+    if backend() != "numba":
+        return
+    terms = np.ones(2)
+    active = np.array([True, False])
+    cols = np.eye(2)
+    index = np.arange(2)
+    src, dst = np.array([0]), np.array([1])
+    score_pairs(terms, terms, active, cols, index, terms, terms, src, dst)
+    best_pair(terms, terms, active, cols, index, terms, terms, src, dst)
+    first_improving(terms, terms, active, cols, index, terms, terms, index, src, dst, 0.0, 0.0)
+    hot_cold_pairs(terms, active, index, 2)
+    tspd_dense(cols, terms, terms, terms, active)
+
+# Entry points. They only make the argument types uniform (contiguous
+# float64/int64/bool arrays, Python scalars) so one compiled specialisation
+# serves every caller.
+def _f(x):
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+def _i(x):
+    return np.ascontiguousarray(x, dtype=np.int64)
+
+def _b(x):
+    return np.ascontiguousarray(x, dtype=np.bool_)
+
+def score_pairs(numerator, denominator, active, cols, slot, idle_power, active_weight, src, dst):
+    return _score_pairs(_f(numerator), _f(denominator), _b(active), _f(cols), _i(slot),
+                        _f(idle_power), _f(active_weight), _i(src), _i(dst))
+
+def best_pair(numerator, denominator, active, cols, slot, idle_power, active_weight, src, dst):
+    k, rho = _best_pair(_f(numerator), _f(denominator), _b(active), _f(cols), _i(slot),
+                        _f(idle_power), _f(active_weight), _i(src), _i(dst))
+    return int(k), float(rho)
+
+def first_improving(numerator, denominator, active, cols, slot, idle_power, active_weight, type_id,
+                    S, D, rho0, threshold):
+    s, d, rho, scanned = _first_improving(_f(numerator), _f(denominator), _b(active), _f(cols), _i(slot),
+                                          _f(idle_power), _f(active_weight), _i(type_id), _i(S), _i(D),
+                                          float(rho0), float(threshold))
+    return int(s), int(d), float(rho), int(scanned)
+
+def hot_cold_pairs(T, active, type_id, num_types):
+    return _hot_cold_pairs(_f(T), _b(active), _i(type_id), int(num_types))
+
+def tspd_dense(B_inv, base, idle_power, active_weight, active):
+    return _tspd_dense(_f(B_inv), _f(base), _f(idle_power), _f(active_weight), _b(active))
@@ -0,0 +1,123 @@
+import numpy as np
+from models.cache import mapping_key
+from models.chip import DEFAULT_CHIP
+
+# Activity of a mapping kept per core type, for generating migration
+# candidates without rescanning A. For every type t, members[t] holds the
+# cores of that type partitioned so that the first n_active[t] are active
+# and the rest idle; position[i] is core i's index in its type's array.
+#
+# A migration only ever moves work between two cores of the same type, so
+# apply_migration() just swaps the two cores' slots: O(1), and the
+# partition stays intact. activate()/deactivate() swap a core with the
+# first idle resp. last active slot and move the boundary, also O(1). The
+# mapping_key bitmask is kept up to date the same way.
+class MappingState:
+    def __init__(self, A, chip=None):
+        self.chip = chip or DEFAULT_CHIP
+        self.type_id = self.chip.type_id
+        self.active = np.asarray(A) == 1
+        self.key = mapping_key(self.active)
+
+        self.members = []
+        self.n_active = np.zeros(self.chip.cores.num_types, dtype=np.int64)
+        self.position = np.empty(self.chip.num_cores, dtype=np.int64)
+        for t in range(self.chip.cores.num_types):
+            of_type = self.type_id == t
+            cores = np.concatenate([np.flatnonzero(of_type & self.active), np.flatnonzero(of_type & ~self.active)])
+            self.members.append(cores)
+            self.n_active[t] = np.count_nonzero(of_type & self.active)
+            self.position[cores] = np.arange(len(cores))
+
+    def copy(self):
+        other = MappingState.__new__(MappingState)
+        other.chip = self.chip
+        other.type_id = self.type_id
+        other.active = self.active.copy()
+        other.key = self.key
+        other.members = [cores.copy() for cores in self.members]
+        other.n_active = self.n_active.copy()
+        other.position = self.position.copy()
+        return other
+
+    @property
+    def A(self):
+        return self.active.astype(int).tolist()
+
+    def child_key(self, s, d):
+        return self.key ^ (1 << int(s)) ^ (1 << int(d))
+
+    def _swap(self, t, i, j):
+        cores = self.members[t]
+        a, b = self.position[i], self.position[j]
+        cores[a], cores[b] = j, i
+        self.position[i], self.position[j] = b, a
+
+    def apply_migration(self, s, d):
+        t = self.type_id[s]
+        if self.type_id[d] != t:
+            raise ValueError(f"Cannot migrate between cores of different types ({s} -> {d})")
+        if not self.active[s] or self.active[d]:
+            raise ValueError(f"Migration {s} -> {d} needs an active source and an idle destination")
+        self._swap(t, s, d)
+        self.active[s], self.active[d] = False, True
+        self.key ^= (1 << int(s)) | (1 << int(d))
+
+    def activate(self, d):
+        if self.active[d]:
+            return
+        t = self.type_id[d]
+        self._swap(t, d, self.members[t][self.n_active[t]])
+        self.n_active[t] += 1
+        self.active[d] = True
+        self.key ^= 1 << int(d)
+
+    def deactivate(self, s):
+        if not self.active[s]:
+            return
+        t = self.type_id[s]
+        self._swap(t, s, self.members[t][self.n_active[t] - 1])
+        self.n_active[t] -= 1
+        self.active[s] = False
+        self.key ^= 1 << int(s)
+
+    # Active and idle cores of type t, in no particular order (views; copy
+    # before holding on to them across updates).
+    def actives(self, t):
+        return self.members[t][:self.n_active[t]]
+
+    def idles(self, t):
+        return self.members[t][self.n_active[t]:]
+
+    # All same-type (active, idle) pairs as two index arrays, ordered by
+    # source and then destination core id. Pairs are laid out type by type
+    # and then gathered into that order, so no active x idle cross product
+    # over different types is ever built.
+    def pairs(self):
+        act_sorted, idle_sorted = [], []
+        for t in range(len(self.members)):
+            act_sorted.append(np.sort(self.actives(t)))
+            idle_sorted.append(np.sort(self.idles(t)))
+
+        n_idle = np.array([len(idles) for idles in idle_sorted], dtype=np.int64)
+        block_sizes = self.n_active * n_idle
+        block_start = np.concatenate([[0], np.cumsum(block_sizes)[:-1]])
+        grouped_dst = np.concatenate([np.tile(idles, len(acts)) for acts, idles in zip(act_sorted, idle_sorted)]
+                                     + [np.empty(0, dtype=np.int64)])
+
+        # Rank of every active core within its type, to find its block of
+        # pairs in the grouped layout.
+        rank = np.empty(len(self.active), dtype=np.int64)
+        for acts in act_sorted:
+            rank[acts] = np.arange(len(acts))
+        src_cores = np.flatnonzero(self.active)
+        src_types = self.type_id[src_cores]
+        counts = n_idle[src_types]
+        offsets = block_start[src_types] + rank[src_cores] * counts
+
+        total = int(counts.sum())
+        starts = np.cumsum(counts) - counts
+        within = np.arange(total) - np.repeat(starts, counts)
+        src = np.repeat(src_cores, counts)
+        dst = grouped_dst[np.repeat(offsets, counts) + within]
+        return src, dst
@@ -1,15 +1,13 @@
-from models.core_info import PER_CORE
+from models.chip import DEFAULT_CHIP
+from models.mapping_state import MappingState
 
-def same_type(i,j):
-    return PER_CORE[i]["type_key"]==PER_CORE[j]["type_key"]
+def same_type(i,j,chip=None):
+    return (chip or DEFAULT_CHIP).same_type(i, j)
 
-def enumerate_migration_pairs(A):
-    actives = [i for i,a in enumerate(A) if a==1]
-    idles   = [i for i,a in enumerate(A) if a==0]
-    for s in actives:
-        for d in idles:
-            if same_type(s,d):
-                yield (s,d)
+# Same-type (active, idle) pairs by source and then destination core id.
+def enumerate_migration_pairs(A, chip=None):
+    src, dst = MappingState(A, chip).pairs()
+    yield from zip(src.tolist(), dst.tolist())
 
 def apply_migration(A,s,d):
     A2 = A[:]
@@ -0,0 +1,160 @@
+import time
+from collections import namedtuple
+import numpy as np
+import models.policies as policies
+from models.chip import DEFAULT_CHIP
+from models.tspd_state import TSPDState
+
+# Workload events: "arrival" queues a task (on `core`, or wherever the
+# controller places it), "completion" finishes one task on `core`, and
+# "idle" drops every task on `core`. `time` is the stream's own timestamp
+# and is only carried through to the decision records.
+Event = namedtuple("Event", ["kind", "core", "time"], defaults=(None, None))
+
+EVENT_KINDS = ("arrival", "completion", "idle")
+
+def resolve_policy(policy):
+    if callable(policy):
+        return policy
+    try:
+        return getattr(policies, f"run_{policy}")
+    except AttributeError:
+        raise ValueError(f"Unknown policy: {policy}") from None
+
+# Runs one of the migration policies online. The activity vector and its
+# TSPDState live across events: arrivals, completions and migrations flip
+# single cores in O(N), and after every event that changes the mapping the
+# policy gets one decision step of at most max_migs migrations, cut short
+# when latency_budget seconds have passed since the event came in.
+class OnlineController:
+    def __init__(self, policy, chip=None, A=None, max_migs=1, latency_budget=None,
+                 refresh_every=1000):
+        self.chip = chip or DEFAULT_CHIP
+        self.policy = resolve_policy(policy)
+        self.max_migs = max_migs
+        self.latency_budget = latency_budget
+        self.refresh_every = refresh_every
+
+        self.A = list(A) if A is not None else [0] * self.chip.num_cores
+        self.load = np.array(self.A, dtype=int)
+        self.state = TSPDState(self.A, self.chip)
+        self.rho = self.state.rho()
+
+        self.latencies = []
+        self.events_seen = 0
+        self.migrations = 0
+        self.over_budget = 0
+
+    def _set_active(self, core, active):
+        if self.A[core] == active:
+            return False
+        self.A[core] = active
+        if active:
+            self.state.activate(core)
+        else:
+            self.state.deactivate(core)
+        return True
+
+    # New tasks go to the idle core whose activation keeps the TSPD budget
+    # highest, or queue on the least loaded core when nothing is idle.
+    def place(self):
+        idles = [i for i, a in enumerate(self.A) if a == 0]
+        if not idles:
+            return int(np.argmin(self.load))
+        scores = self.state.score_activations(idles)
+        return idles[int(np.argmax(scores))]
+
+    def _apply_event(self, event):
+        if event.kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind: {event.kind}")
+
+        if event.kind == "arrival":
+            core = self.place() if event.core is None else event.core
+            self.load[core] += 1
+            return core, self._set_active(core, 1)
+
+        if event.core is None:
+            raise ValueError(f"{event.kind} event needs a core")
+        core = event.core
+        if event.kind == "completion":
+            self.load[core] = max(self.load[core] - 1, 0)
+        else:
+            self.load[core] = 0
+        return core, self.load[core] == 0 and self._set_active(core, 0)
+
+    def handle(self, event):
+        start = time.perf_counter()
+        core, changed = self._apply_event(event)
+
+        moves = []
+        if changed:
+            deadline = start + self.latency_budget if self.latency_budget is not None else None
+            data = self.policy(self.A, max_migs=self.max_migs, chip=self.chip,
+                               state=self.state, deadline=deadline)
+            moves = data['migration_sequence']
+            for s, d in moves:
+                self.load[d] += self.load[s]
+                self.load[s] = 0
+            self.A = list(data['A'])
+            self.rho = data['rho']
+            self.migrations += len(moves)
+
+        self.events_seen += 1
+        if self.refresh_every and self.events_seen % self.refresh_every == 0:
+            self.state.refresh()
+
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        if self.latency_budget is not None and latency > self.latency_budget:
+            self.over_budget += 1
+
+        return {
+            'event': event,
+            'core': core,
+            'migrations': moves,
+            'rho': self.rho,
+            'latency': latency
+        }
+
+    def run(self, events):
+        for event in events:
+            self.handle(event)
+        return self.summary()
+
+    async def run_async(self, events):
+        async for event in events:
+            self.handle(event)
+        return self.summary()
+
+    def latency_percentiles(self, percentiles=(50, 90, 99, 99.9)):
+        if not self.latencies:
+            return {p: 0.0 for p in percentiles}
+        values = np.percentile(self.latencies, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def summary(self):
+        return {
+            'events': self.events_seen,
+            'active_cores': int(sum(self.A)),
+            'migrations': self.migrations,
+            'rho': self.rho,
+            'over_budget': self.over_budget,
+            'latency_mean': float(np.mean(self.latencies)) if self.latencies else 0.0,
+            'latency_max': float(np.max(self.latencies)) if self.latencies else 0.0,
+            'latency_percentiles': self.latency_percentiles()
+        }
+
+# Random arrival/completion stream for trying the controller out: each step
+# is an arrival with probability arrival_prob, placed by the controller,
+# otherwise the completion of a task on one of the controller's busy cores.
+# The generator is lazy, so it always sees the load after earlier events
+# and migrations.
+def synthetic_events(controller, num_events, seed=0, arrival_prob=0.5):
+    rng = np.random.default_rng(seed)
+
+    for k in range(num_events):
+        busy = np.flatnonzero(controller.load)
+        if len(busy) == 0 or rng.random() < arrival_prob:
+            yield Event("arrival", None, k)
+        else:
+            yield Event("completion", int(rng.choice(busy)), k)
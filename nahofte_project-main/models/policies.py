@@ -1,215 +1,477 @@
-from models.thermal import getTSPD, global_TSPD_budget, dvfs_from_budget, throughput, predict_temps
-from models.migration import enumerate_migration_pairs, apply_migration
-from models.core_info import PER_CORE
-from config import THRESH_MIG_GAIN, NUM_CORES
+import time
+import numpy as np
+from models.thermal import dvfs_from_budget, throughput, predict_temps, evaluate_mapping
+from models.migration import apply_migration
+from models.tspd_state import TSPDState
+from models.mapping_state import MappingState
+from models import kernels
+from models.chip import DEFAULT_CHIP
+from config import THRESH_MIG_GAIN, BETA, GAMMA, DELTA, MIGRATION_COST
+
+# Every policy also accepts a live TSPDState for A (kept in step with the
+# moves it makes), a time.perf_counter() deadline after which it stops
+# taking further steps, and a models.instrument.PolicyTrace that records its
+# decision cost. All default to the plain one-shot behaviour.
+def _evaluate(A, chip, state, trace=None):
+    if trace is not None:
+        trace.count('evaluate_calls')
+    if state is None:
+        return evaluate_mapping(A, chip)
+    R, rho = state.R(), state.rho()
+    F = dvfs_from_budget(A, rho, chip)
+    return R, rho, F, throughput(A, F, chip)
+
+def _out_of_time(deadline):
+    return deadline is not None and time.perf_counter() >= deadline
 
 # ------------------- Proposed -------------------
-def run_Proposed(A, max_migs=15):
+def run_Proposed(A, max_migs=15, chip=None, state=None, deadline=None, trace=None):
+    chip = chip or DEFAULT_CHIP
+    if trace is not None:
+        trace.begin(chip)
     migs = 0
-    R = getTSPD(A)
-    rho = global_TSPD_budget(R)
-    F = dvfs_from_budget(A, rho)
-    initial_throughput = throughput(A, F)
+    sequence = []
+    R, rho, F, initial_throughput = _evaluate(A, chip, state, trace)
+    if state is None:
+        state = TSPDState(A, chip)
+    if trace is not None:
+        trace.lap("setup")
 
-    while migs < max_migs:
+    while migs < max_migs and not _out_of_time(deadline):
         actives = [i for i,a in enumerate(A) if a==1]
         idles = [i for i,a in enumerate(A) if a==0]
         
         S = sorted(actives, key=lambda i: R[i])
+        if trace is not None:
+            trace.lap("candidates")
         
-        idle_R_estimates = []
-        for d in idles:
-            A_temp = A.copy()
-            A_temp[d] = 1
-            R_temp = getTSPD(A_temp)
-            rho_temp = global_TSPD_budget(R_temp)
-            idle_R_estimates.append((d, rho_temp))
+        idle_R_estimates = list(zip(idles, state.score_activations(idles)))
+        if trace is not None:
+            trace.lap("scoring", len(idles))
         
         D = sorted(idle_R_estimates, key=lambda x: x[1], reverse=True)
         D = [d for d, _ in D]
         
-        used_types = set()
-        moved = False
-
-        for s in S:
-            t_s = PER_CORE[s]['type_key']
-            if t_s in used_types: 
-                continue
-                
-            for d in D:
-                if PER_CORE[d]['type_key'] != t_s: 
-                    continue
-                    
-                A2 = apply_migration(A, s, d)
-                R2 = getTSPD(A2)
-                rho2 = global_TSPD_budget(R2)
-                
-                if rho2 - rho > THRESH_MIG_GAIN:
-                    A, R, rho = A2, R2, rho2
-                    F = dvfs_from_budget(A, rho)
-                    migs += 1
-                    moved = True
-                    used_types.add(t_s)
-                    break
-                    
-            if moved: 
-                break
-                
+        s, d, rho_new, scanned = state.first_improving_migration(S, D, rho, THRESH_MIG_GAIN)
+        if trace is not None:
+            trace.lap("scoring", scanned)
+        
+        moved = s >= 0
+        if moved:
+            if trace is not None:
+                trace.accept(s, d, rho, rho_new)
+            A = apply_migration(A, s, d)
+            state.commit(s, d)
+            R, rho = state.R(), rho_new
+            F = dvfs_from_budget(A, rho, chip)
+            sequence.append((s, d))
+            migs += 1
+            if trace is not None:
+                trace.lap("commit")
+        
+        if trace is not None:
+            trace.lap("candidates")
+            trace.end_step()
         if not moved: 
             break
             
-    final_throughput = throughput(A, F)
+    final_throughput = throughput(A, F, chip)
+    if trace is not None:
+        trace.end()
     return {
         'A': A, 
         'F': F, 
         'rho': rho, 
         'throughput': final_throughput, 
         'migrations': migs,
+        'migration_sequence': sequence,
         'throughput_gain': final_throughput - initial_throughput
     }
 
 # ------------------- PdOracle -------------------
-def run_PdOracle(A, max_migs=15):
+def run_PdOracle(A, max_migs=15, chip=None, state=None, deadline=None, trace=None):
+    chip = chip or DEFAULT_CHIP
+    if trace is not None:
+        trace.begin(chip)
     migs = 0
-    R = getTSPD(A)
-    rho = global_TSPD_budget(R)
-    F = dvfs_from_budget(A, rho)
-    initial_throughput = throughput(A, F)
+    sequence = []
+    R, rho, F, initial_throughput = _evaluate(A, chip, state, trace)
+    if state is None:
+        state = TSPDState(A, chip)
+    mapping = MappingState(A, chip)
+    if trace is not None:
+        trace.lap("setup")
 
-    while migs < max_migs:
-        best_gain = 0.0
-        best_pair = None
+    while migs < max_migs and not _out_of_time(deadline):
+        src, dst = mapping.pairs()
+        if trace is not None:
+            trace.lap("candidates")
+        if not len(src):
+            break
         
-        for s, d in enumerate_migration_pairs(A):
-            A2 = apply_migration(A, s, d)
-            R2 = getTSPD(A2)
-            rho2 = global_TSPD_budget(R2)
-            gain = rho2 - rho
-            
-            if gain > best_gain:
-                best_gain = gain
-                best_pair = (s, d)
+        best, best_rho = state.best_migration(src, dst)
+        best_gain = best_rho - rho
+        if trace is not None:
+            trace.lap("scoring", len(src))
+            trace.end_step()
                 
-        if best_gain > THRESH_MIG_GAIN and best_pair:
-            s, d = best_pair
+        if best_gain > THRESH_MIG_GAIN:
+            s, d = src[best], dst[best]
+            if trace is not None:
+                trace.accept(s, d, rho, best_rho)
             A = apply_migration(A, s, d)
-            R = getTSPD(A)
-            rho = global_TSPD_budget(R)
-            F = dvfs_from_budget(A, rho)
+            mapping.apply_migration(s, d)
+            state.commit(s, d)
+            rho = best_rho
+            F = dvfs_from_budget(A, rho, chip)
+            sequence.append((int(s), int(d)))
             migs += 1
+            if trace is not None:
+                trace.lap("commit")
         else:
             break
             
-    final_throughput = throughput(A, F)
+    final_throughput = throughput(A, F, chip)
+    if trace is not None:
+        trace.end()
     return {
         'A': A, 
         'F': F, 
         'rho': rho, 
         'throughput': final_throughput, 
         'migrations': migs,
+        'migration_sequence': sequence,
         'throughput_gain': final_throughput - initial_throughput
     }
 
 # ------------------- PerfOracle -------------------
-def run_PerfOracle(A, max_migs=15):
+def run_PerfOracle(A, max_migs=15, chip=None, state=None, deadline=None, trace=None):
+    chip = chip or DEFAULT_CHIP
+    if trace is not None:
+        trace.begin(chip)
     migs = 0
-    R = getTSPD(A)
-    rho = global_TSPD_budget(R)
-    F = dvfs_from_budget(A, rho)
-    tp = throughput(A, F)
+    sequence = []
+    R, rho, F, tp = _evaluate(A, chip, state, trace)
     initial_throughput = tp
+    if state is None:
+        state = TSPDState(A, chip)
+    mapping = MappingState(A, chip)
+    if trace is not None:
+        trace.lap("setup")
 
-    while migs < max_migs:
-        best_gain = 0.0
-        best_pair = None
+    while migs < max_migs and not _out_of_time(deadline):
+        src, dst = mapping.pairs()
+        if trace is not None:
+            trace.lap("candidates")
+        if not len(src):
+            break
         
-        for s, d in enumerate_migration_pairs(A):
-            A2 = apply_migration(A, s, d)
-            R2 = getTSPD(A2)
-            rho2 = global_TSPD_budget(R2)
-            F2 = dvfs_from_budget(A2, rho2)
-            tp2 = throughput(A2, F2)
-            gain = tp2 - tp
-            
-            if gain > best_gain:
-                best_gain = gain
-                best_pair = (s, d)
+        rho_batch, tp_batch = state.score_throughput(src, dst)
+        best = int(np.argmax(tp_batch))
+        best_gain = tp_batch[best] - tp
+        if trace is not None:
+            trace.lap("scoring", len(src))
+            trace.end_step()
                 
-        if best_gain > 0 and best_pair:
-            s, d = best_pair
+        if best_gain > 0:
+            s, d = src[best], dst[best]
+            if trace is not None:
+                trace.accept(s, d, rho, rho_batch[best])
             A = apply_migration(A, s, d)
-            R = getTSPD(A)
-            rho = global_TSPD_budget(R)
-            F = dvfs_from_budget(A, rho)
-            tp = throughput(A, F)
+            mapping.apply_migration(s, d)
+            state.commit(s, d)
+            rho = float(rho_batch[best])
+            F = dvfs_from_budget(A, rho, chip)
+            tp = float(tp_batch[best])
+            sequence.append((int(s), int(d)))
             migs += 1
+            if trace is not None:
+                trace.lap("commit")
         else:
             break
             
+    if trace is not None:
+        trace.end()
     return {
         'A': A, 
         'F': F, 
         'rho': rho, 
         'throughput': tp, 
         'migrations': migs,
+        'migration_sequence': sequence,
         'throughput_gain': tp - initial_throughput
     }
 
 # ------------------- HotCold -------------------
-def run_HotCold(A, max_migs=15, temp_eps=0.5):
+# Hottest active and coldest idle core of each type, in type order, lowest
+# core id on ties; -1 for a type without active or idle cores.
+def _hot_cold_pairs(T, mapping, chip):
+    if kernels.enabled():
+        hot, cold = kernels.hot_cold_pairs(T, mapping.active, chip.type_id, chip.cores.num_types)
+        return hot.tolist(), cold.tolist()
+    hot, cold = [], []
+    for t in range(chip.cores.num_types):
+        act = np.sort(mapping.actives(t))
+        idle = np.sort(mapping.idles(t))
+        hot.append(int(act[np.argmax(T[act])]) if len(act) else -1)
+        cold.append(int(idle[np.argmin(T[idle])]) if len(idle) else -1)
+    return hot, cold
+
+def run_HotCold(A, max_migs=15, temp_eps=0.5, chip=None, state=None, deadline=None, trace=None):
+    chip = chip or DEFAULT_CHIP
+    if trace is not None:
+        trace.begin(chip)
     migs = 0
-    R = getTSPD(A)
-    rho = global_TSPD_budget(R)
-    F = dvfs_from_budget(A, rho)
-    T = predict_temps(A, F)
-    initial_throughput = throughput(A, F)
+    sequence = []
+    R, rho, F, initial_throughput = _evaluate(A, chip, state, trace)
+    T = predict_temps(A, F, chip)
+    mapping = MappingState(A, chip)
+    if trace is not None:
+        trace.count('predict_temps_calls')
+        trace.lap("setup")
     
     visited = set()
-    
-    def A_key(A):
-        return tuple(A)
 
-    while migs < max_migs:
+    while migs < max_migs and not _out_of_time(deadline):
         moved = False
-        types = set(PER_CORE[i]['type_key'] for i in range(NUM_CORES))
-        
-        for tk in types:
-            act = [i for i,a in enumerate(A) if a==1 and PER_CORE[i]['type_key']==tk]
-            idle = [i for i,a in enumerate(A) if a==0 and PER_CORE[i]['type_key']==tk]
-            
-            if not act or not idle:
+        # Type ids number the types in core order, so the visiting order
+        # does not depend on string hashing across worker processes.
+        hot, cold = _hot_cold_pairs(T, mapping, chip)
+        for s, d in zip(hot, cold):
+            if s < 0 or d < 0:
                 continue
                 
-            s = max(act, key=lambda i: T[i])
-            d = min(idle, key=lambda i: T[i])
-            
             if T[s] - T[d] <= temp_eps:
                 continue
                 
-            A2 = apply_migration(A, s, d)
-            
-            if A_key(A2) in visited:
+            key = mapping.child_key(s, d)
+            if key in visited:
                 continue
                 
-            visited.add(A_key(A2))
-            A = A2
-            R = getTSPD(A)
-            rho = global_TSPD_budget(R)
-            F = dvfs_from_budget(A, rho)
-            T = predict_temps(A, F)
+            visited.add(key)
+            if trace is not None:
+                trace.lap("candidates")
+            rho_before = rho
+            A = apply_migration(A, s, d)
+            mapping.apply_migration(s, d)
+            if state is not None:
+                state.commit(s, d)
+            if trace is not None:
+                trace.lap("commit")
+            R, rho, F, _ = _evaluate(A, chip, state, trace)
+            T = predict_temps(A, F, chip)
+            if trace is not None:
+                trace.count('predict_temps_calls')
+                trace.lap("scoring", 1)
+                trace.accept(s, d, rho_before, rho)
+            sequence.append((int(s), int(d)))
             migs += 1
             moved = True
             break
-            
+        
+        if trace is not None:
+            trace.lap("candidates")
+            trace.end_step()
         if not moved:
             break
             
-    final_throughput = throughput(A, F)
+    final_throughput = throughput(A, F, chip)
+    if trace is not None:
+        trace.end()
     return {
         'A': A, 
         'F': F, 
         'rho': rho, 
         'throughput': final_throughput, 
         'migrations': migs,
+        'migration_sequence': sequence,
+        'throughput_gain': final_throughput - initial_throughput
+    }
+
+# ------------------- BeamSearch -------------------
+# Searches migration sequences up to max_migs deep, keeping the beam_width
+# best mappings per level by rho (objective="rho") or throughput
+# (objective="throughput"). Unlike the greedy oracles, the beam may pass
+# through worse mappings; the best mapping seen at any depth is returned.
+# Children of all beam nodes are scored in one batch from each node's
+# TSPDState, and a transposition table on the activity bitmask means a
+# mapping reached along several sequences is scored once. max_evals and
+# deadline bound the work.
+def run_BeamSearch(A, max_migs=15, beam_width=4, objective="rho", max_evals=20000,
+                   chip=None, state=None, deadline=None, trace=None):
+    if objective not in ("rho", "throughput"):
+        raise ValueError(f"Unknown beam search objective: {objective}")
+    chip = chip or DEFAULT_CHIP
+    if trace is not None:
+        trace.begin(chip)
+    R, rho, F, initial_throughput = _evaluate(A, chip, state, trace)
+    root = TSPDState(A, chip) if state is None else state.copy()
+    root_mapping = MappingState(A, chip)
+    root_key = root_mapping.key
+    if trace is not None:
+        trace.lap("setup")
+    
+    def score(node, src, dst):
+        if objective == "rho":
+            return node.score_migrations(src, dst)
+        return node.score_throughput(src, dst)[1]
+    
+    table = {root_key: rho if objective == "rho" else initial_throughput}
+    best_score, best_sequence = table[root_key], []
+    # Beam entries: (key, TSPDState, MappingState, migration sequence so far).
+    beam = [(root_key, root, root_mapping, [])]
+    evaluations = 0
+    
+    for _ in range(max_migs):
+        children = []
+        for key, node, mapping, sequence in beam:
+            if _out_of_time(deadline) or evaluations >= max_evals:
+                break
+            src, dst = mapping.pairs()
+            if not len(src):
+                continue
+            
+            child_keys = [key ^ (1 << int(s)) ^ (1 << int(d)) for s, d in zip(src, dst)]
+            fresh = [k for k, child in enumerate(child_keys) if child not in table]
+            fresh = fresh[:max_evals - evaluations]
+            if trace is not None:
+                trace.lap("candidates")
+            if not fresh:
+                continue
+            
+            scores = score(node, src[fresh], dst[fresh])
+            evaluations += len(fresh)
+            if trace is not None:
+                trace.lap("scoring", len(fresh))
+            for k, value in zip(fresh, scores.tolist()):
+                table[child_keys[k]] = value
+                children.append((value, child_keys[k], node, mapping, sequence, int(src[k]), int(dst[k])))
+        
+        if trace is not None:
+            trace.end_step()
+        if not children:
+            break
+        
+        order = sorted(range(len(children)), key=lambda k: -children[k][0])[:beam_width]
+        beam = []
+        for k in order:
+            value, child_key, node, mapping, sequence, s, d = children[k]
+            child = node.copy()
+            child.commit(s, d)
+            child_mapping = mapping.copy()
+            child_mapping.apply_migration(s, d)
+            beam.append((child_key, child, child_mapping, sequence + [(s, d)]))
+            if value > best_score:
+                best_score, best_sequence = value, sequence + [(s, d)]
+        if trace is not None:
+            trace.lap("commit")
+    
+    if trace is not None:
+        path = root.copy() if state is None else state.copy()
+    for s, d in best_sequence:
+        A = apply_migration(A, s, d)
+        if state is not None:
+            state.commit(s, d)
+        if trace is not None:
+            rho_before = path.rho()
+            path.commit(s, d)
+            trace.accept(s, d, rho_before, path.rho())
+    
+    R, rho, F, final_throughput = _evaluate(A, chip, state, trace)
+    if trace is not None:
+        trace.end()
+    return {
+        'A': A, 
+        'F': F, 
+        'rho': rho, 
+        'throughput': final_throughput, 
+        'migrations': len(best_sequence),
+        'migration_sequence': best_sequence,
+        'evaluations': evaluations,
         'throughput_gain': final_throughput - initial_throughput
-    }
\ No newline at end of file
+    }
+
+# ------------------- MultiObjective -------------------
+# Greedy like PdOracle, but a migration is worth
+#   J = beta  * (rho - rho_now) / rho_0
+#     + gamma * (throughput - throughput_now) / throughput_0
+#     + delta * (spread_now - spread) / spread_0
+#     - migration_cost
+# where spread is the standard deviation of the predicted core temperatures
+# and the _0 values are those of the starting mapping. The best migration is
+# taken while J > 0, so a migration has to buy more than it costs.
+#
+# All candidates are scored in batches. Same-type migrations keep the number
+# of active cores per type, so a candidate's throughput follows from its rho
+# alone (TSPDState.throughput_at), and its spread comes from TSPDState's
+# per-type heat terms, which like the TSPD sums only change in the two
+# migrated columns. A step costs about one and a half PdOracle steps.
+def run_MultiObjective(A, max_migs=15, beta=BETA, gamma=GAMMA, delta=DELTA, migration_cost=MIGRATION_COST,
+                       chip=None, state=None, deadline=None, trace=None):
+    chip = chip or DEFAULT_CHIP
+    if trace is not None:
+        trace.begin(chip)
+    migs = 0
+    sequence = []
+    objective = 0.0
+    R, rho, F, tp = _evaluate(A, chip, state, trace)
+    initial_throughput = tp
+    if state is None:
+        state = TSPDState(A, chip)
+    mapping = MappingState(A, chip)
+    spread = float(np.std(state.temperatures(rho)))
+    rho_ref = rho if rho > 0 else 1.0
+    tp_ref = tp if tp > 0 else 1.0
+    spread_ref = spread if spread > 0 else 1.0
+    if trace is not None:
+        trace.lap("setup")
+
+    while migs < max_migs and not _out_of_time(deadline):
+        src, dst = mapping.pairs()
+        if trace is not None:
+            trace.lap("candidates")
+        if not len(src):
+            break
+        
+        rho_batch = state.score_migrations(src, dst)
+        tp_batch = state.throughput_at(rho_batch)
+        spreads = state.score_spread(src, dst, rho_batch)
+        tp_now = state.throughput_at([rho])[0]
+        values = (beta * (rho_batch - rho) / rho_ref + gamma * (tp_batch - tp_now) / tp_ref
+                  + delta * (spread - spreads) / spread_ref - migration_cost)
+        best = int(np.argmax(values))
+        if trace is not None:
+            trace.lap("scoring", len(src))
+            trace.end_step()
+        
+        if values[best] > 0:
+            s, d = int(src[best]), int(dst[best])
+            if trace is not None:
+                trace.accept(s, d, rho, rho_batch[best])
+            A = apply_migration(A, s, d)
+            mapping.apply_migration(s, d)
+            state.commit(s, d)
+            rho, spread = float(rho_batch[best]), float(spreads[best])
+            F = dvfs_from_budget(A, rho, chip)
+            tp = throughput(A, F, chip)
+            objective += float(values[best])
+            sequence.append((s, d))
+            migs += 1
+            if trace is not None:
+                trace.lap("commit")
+        else:
+            break
+            
+    if trace is not None:
+        trace.end()
+    return {
+        'A': A, 
+        'F': F, 
+        'rho': rho, 
+        'throughput': tp, 
+        'migrations': migs,
+        'migration_sequence': sequence,
+        'objective': objective,
+        'temperature_spread': spread,
+        'throughput_gain': tp - initial_throughput
+    }
@@ -0,0 +1,191 @@
+import heapq
+import numpy as np
+from data.tasks import task as TASK_DATA
+from models.chip import DEFAULT_CHIP
+from models.thermal import dvfs_from_budget_batch, throughput, dvfs_from_budget
+from models.tspd_state import TSPDState
+from models.online import resolve_policy
+
+# Per-type task catalogue from data/tasks.py: task_time is the run time at
+# fmax in seconds, task_power the active power of the task at fmax.
+def task_catalog(type_key):
+    tasks = TASK_DATA["cores"][type_key]["tasks"]
+    times = np.array([t["task_time"] for t in tasks], dtype=float)
+    powers = np.array([t["task_power"] for t in tasks], dtype=float)
+    return times, powers
+
+# One copy of its type's catalogue for every active core, repeated `copies`
+# times, so copies=1 is the workload sum_task_time stands for. Returns the
+# per-task type, run time at fmax and power.
+def make_workload(A, chip=None, copies=1):
+    chip = chip or DEFAULT_CHIP
+    types, times, powers = [], [], []
+
+    for i, a in enumerate(A):
+        if a != 1:
+            continue
+        type_key = chip.get_core_type(i)
+        t, p = task_catalog(type_key)
+        for _ in range(copies):
+            types.extend([type_key] * len(t))
+            times.append(t)
+            powers.append(p)
+
+    if not times:
+        return [], np.zeros(0), np.zeros(0)
+    return types, np.concatenate(times), np.concatenate(powers)
+
+# Discrete-event simulation of individual tasks on the chip. Tasks start on
+# the cores that are active in A, spread over same-type cores longest task
+# first with a min-heap on assigned work. Every core keeps a heap of waiting
+# tasks (shortest first) and runs one task at a time at the frequency the
+# current TSPD budget allows. After each completion the budget is updated
+# incrementally, a core that runs dry can steal one waiting task from the
+# busiest core of its type, and an optional policy takes a decision step
+# whose migrations move the running task (and its queue) to the new core.
+# Core power while running is 0.3*p_idle + task_power*(F/fmax)**3.5.
+class TaskSimulator:
+    def __init__(self, A, chip=None, copies=1, policy=None, max_migs=1, steal=True):
+        self.chip = chip = chip or DEFAULT_CHIP
+        self.policy = resolve_policy(policy) if policy is not None else None
+        self.max_migs = max_migs
+        self.steal = steal
+
+        self.A0 = list(A)
+        self.num_sets = copies * sum(1 for a in A if a == 1)
+        self.core_type = np.array(chip.core_types)
+        self.task_type, self.task_time, self.task_power = make_workload(A, chip, copies)
+        n = chip.num_cores
+
+        self.queues = [[] for _ in range(n)]
+        self.waiting_work = np.zeros(n)
+        self.running = np.full(n, -1)
+        self.remaining = np.zeros(n)
+        self._assign(A)
+
+    def _assign(self, A):
+        chip = self.chip
+        heaps = {}
+        for i, a in enumerate(A):
+            if a == 1:
+                heaps.setdefault(chip.get_core_type(i), []).append((0.0, i))
+
+        for k in np.argsort(-self.task_time, kind="stable"):
+            heap = heaps[self.task_type[k]]
+            load, i = heap[0]
+            heapq.heapreplace(heap, (load + self.task_time[k], i))
+            heapq.heappush(self.queues[i], (self.task_time[k], int(k)))
+            self.waiting_work[i] += self.task_time[k]
+
+        for i in range(chip.num_cores):
+            self._start_next(i)
+
+    def _start_next(self, i):
+        if not self.queues[i]:
+            self.running[i] = -1
+            self.remaining[i] = 0.0
+            return False
+        t, k = heapq.heappop(self.queues[i])
+        self.waiting_work[i] -= t
+        self.running[i] = k
+        self.remaining[i] = t
+        return True
+
+    # Moves one waiting task from the same-type core with the most waiting
+    # work onto idle core i.
+    def _steal_into(self, i):
+        same = self.core_type == self.core_type[i]
+        victim = int(np.argmax(np.where(same, self.waiting_work, -1.0)))
+        if self.waiting_work[victim] <= 0 or not self.queues[victim]:
+            return False
+        t, k = heapq.heappop(self.queues[victim])
+        self.waiting_work[victim] -= t
+        self.running[i] = k
+        self.remaining[i] = t
+        return True
+
+    def _migrate(self, s, d):
+        self.running[d], self.running[s] = self.running[s], -1
+        self.remaining[d], self.remaining[s] = self.remaining[s], 0.0
+        self.queues[d], self.queues[s] = self.queues[s], []
+        self.waiting_work[d], self.waiting_work[s] = self.waiting_work[s], 0.0
+
+    def run(self, max_events=None):
+        chip = self.chip
+        fmax, idle_power = chip.fmax, chip.idle_power
+        active = self.running >= 0
+        state = TSPDState(active.astype(int), chip)
+
+        A0 = active.astype(int).tolist()
+        rho0 = state.rho()
+        initial_throughput = throughput(A0, dvfs_from_budget(A0, rho0, chip), chip)
+
+        now = energy = 0.0
+        peak = -np.inf
+        completed = migrations = steals = events = 0
+        finish_time = np.full(len(self.task_time), np.nan)
+
+        while active.any():
+            if max_events is not None and events >= max_events:
+                break
+
+            rho = state.rho()
+            F = dvfs_from_budget_batch(active[None, :], np.array([rho]), chip)[0]
+            rate = np.divide(F, fmax, out=np.zeros_like(F), where=fmax > 0)
+            if not (rate[active] > 0).any():
+                raise RuntimeError(f"No active core can make progress at rho={rho}")
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                time_left = np.where(active & (rate > 0), self.remaining / rate, np.inf)
+            dt = float(time_left.min())
+
+            power = idle_power.copy()
+            running = np.flatnonzero(active)
+            power[running] += self.task_power[self.running[running]] * rate[running] ** 3.5
+            T = chip.solver.apply(power) + chip.T_const
+            peak = max(peak, float(T.max()))
+            energy += float(power.sum()) * dt
+
+            now += dt
+            self.remaining[active] -= dt * rate[active]
+            done = np.flatnonzero(active & (time_left <= dt * (1 + 1e-12)))
+            events += 1
+
+            for i in done:
+                finish_time[self.running[i]] = now
+                completed += 1
+                if self._start_next(i):
+                    continue
+                if self.steal and self._steal_into(i):
+                    steals += 1
+                    continue
+                state.deactivate(i)
+
+            active = self.running >= 0
+
+            if self.policy is not None and active.any():
+                A = active.astype(int).tolist()
+                data = self.policy(A, max_migs=self.max_migs, chip=chip, state=state)
+                for s, d in data['migration_sequence']:
+                    self._migrate(s, d)
+                    migrations += 1
+                active = self.running >= 0
+
+        makespan = now
+        return {
+            'tasks': len(self.task_time),
+            'completed': completed,
+            'makespan': makespan,
+            'throughput': completed / makespan if makespan > 0 else 0.0,
+            # Comparable with throughput(): task sets (one catalogue per core)
+            # finished per second, over the whole run.
+            'set_throughput': self.num_sets / makespan if makespan > 0 and completed == len(self.task_time) else 0.0,
+            'mean_completion_time': float(np.nanmean(finish_time)) if completed else 0.0,
+            'initial_rho': rho0,
+            'analytic_throughput': initial_throughput,
+            'energy': energy,
+            'peak_temperature': peak,
+            'migrations': migrations,
+            'steals': steals,
+            'events': events
+        }
@@ -1,45 +1,117 @@
 import math
 import numpy as np
-from config import T_DTM, T_AMB, NUM_CORES
-from models.core_info import PER_CORE
+from config import T_DTM, T_AMB
+from models.cache import mapping_key
+from models.chip import DEFAULT_CHIP
+from models import kernels
+from models.thermal_solver import DenseThermalSolver, SparseThermalSolver
+from models.thermal_cache import thermal_cache_key, load_thermal_state, save_thermal_state
 
-GRID_W, GRID_H = 13, 4
+def core_xy(cid, chip=None):
+    chip = chip or DEFAULT_CHIP
+    return chip.core_xy(cid)
 
-def core_xy(cid):
-    return (cid % GRID_W, cid // GRID_W)
+def self_conductance(core_type):
+    if "amd_k6_iii" in core_type:
+        return 0.8
+    elif "amd_k6_2" in core_type:
+        return 1.0
+    else:
+        return 1.2
+
+def core_coordinates(chip=None):
+    chip = chip or DEFAULT_CHIP
+    ids = np.arange(chip.num_cores)
+    return ids % chip.grid_w, ids // chip.grid_w
 
-def precompute_thermal_matrix():
-    B = np.zeros((NUM_CORES, NUM_CORES))
-    G = np.zeros(NUM_CORES)
+def ambient_conductance(chip=None):
+    chip = chip or DEFAULT_CHIP
+    grid_w, grid_h = chip.grid_w, chip.grid_h
+    xs, ys = core_coordinates(chip)
     
-    for i in range(NUM_CORES):
-        xi, yi = core_xy(i)
-        
-        core_type = PER_CORE[i]["type_key"]
-        if "amd_k6_iii" in core_type:
-            B[i, i] = 0.8
-        elif "amd_k6_2" in core_type:
-            B[i, i] = 1.0
-        else:
-            B[i, i] = 1.2
-        
-        edge_factor = 0.3 + 0.7 * (min(xi, GRID_W-xi-1) + min(yi, GRID_H-1)) / (GRID_W + GRID_H)
-        G[i] = 0.08 * edge_factor
-        
-        for j in range(i+1, NUM_CORES):
-            xj, yj = core_xy(j)
-            dist = math.hypot(xi-xj, yi-yj)
-            
-            core_type_i = PER_CORE[i]["type_key"]
-            core_type_j = PER_CORE[j]["type_key"]
+    edge_factor = 0.3 + 0.7 * (np.minimum(xs, grid_w-xs-1) + np.minimum(ys, grid_h-1)) / (grid_w + grid_h)
+    return 0.08 * edge_factor
+
+# Pairwise core-to-core conductances, 0.7*exp(-dist/1.2) scaled by 0.6 across
+# core types, built by broadcasting the coordinate arrays. The diagonal is 0.
+def coupling_conductances(chip=None):
+    chip = chip or DEFAULT_CHIP
+    xs, ys = core_coordinates(chip)
+    types = np.array(chip.core_types)
+    
+    dist = np.hypot(xs[:, None] - xs[None, :], ys[:, None] - ys[None, :])
+    conductance = 0.7 * np.exp(-dist/1.2)
+    conductance[types[:, None] != types[None, :]] *= 0.6
+    np.fill_diagonal(conductance, 0.0)
+    
+    return conductance
+
+# With diagonal_coupling every core's couplings are also added to its own
+# diagonal entry (the variant models/thermal_model.py used to build);
+# without it the diagonal only holds the per-type self conductance.
+def thermal_matrix(chip=None, diagonal_coupling=False):
+    chip = chip or DEFAULT_CHIP
+    
+    B = coupling_conductances(chip)
+    diagonal = np.array([self_conductance(t) for t in chip.core_types])
+    if diagonal_coupling:
+        diagonal = diagonal + B.sum(axis=1)
+    B[np.diag_indices(chip.num_cores)] = diagonal
+    
+    return B, ambient_conductance(chip)
+
+# Same B as thermal_matrix, but couplings below tol are dropped and only
+# grid offsets within the matching cutoff radius are ever generated, so
+# construction and storage are O(N * neighbours) instead of O(N^2).
+def sparse_thermal_matrix(chip=None, tol=1e-4, diagonal_coupling=False):
+    from scipy import sparse
+    
+    chip = chip or DEFAULT_CHIP
+    num_cores = chip.num_cores
+    grid_w, grid_h = chip.grid_w, chip.grid_h
+    
+    ids = np.arange(num_cores)
+    xs, ys = core_coordinates(chip)
+    types = np.array(chip.core_types)
+    G = ambient_conductance(chip)
+    
+    radius = -1.2 * math.log(tol / 0.7) if tol < 0.7 else 0.0
+    reach = int(math.floor(radius))
+    
+    rows = [ids]
+    cols = [ids]
+    vals = [np.array([self_conductance(t) for t in chip.core_types])]
+    for dy in range(0, reach + 1):
+        for dx in range(-reach, reach + 1):
+            if dy == 0 and dx <= 0:
+                continue
+            dist = math.hypot(dx, dy)
+            if dist > radius:
+                continue
             
-            base_conductance = 0.7 * math.exp(-dist/1.2)
+            inside = (xs + dx >= 0) & (xs + dx < grid_w) & (ys + dy < grid_h)
+            i = ids[inside]
+            j = i + dy * grid_w + dx
             
-            if core_type_i != core_type_j:
-                base_conductance *= 0.6
+            conductance = np.full(len(i), 0.7 * math.exp(-dist/1.2))
+            conductance[types[i] != types[j]] *= 0.6
+            keep = conductance >= tol
             
-            B[i, j] = base_conductance
-            B[j, i] = base_conductance
+            rows += [i[keep], j[keep]]
+            cols += [j[keep], i[keep]]
+            vals += [conductance[keep], conductance[keep]]
+    
+    B = sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(num_cores, num_cores))
+    if diagonal_coupling:
+        B = B + sparse.diags(np.asarray(B.sum(axis=1)).ravel() - B.diagonal())
+    return B, G
+
+THERMAL_BUILDERS = (self_conductance, core_coordinates, ambient_conductance, coupling_conductances,
+                    thermal_matrix, DenseThermalSolver)
+
+def precompute_thermal_matrix(chip=None, diagonal_coupling=False):
+    B, G = thermal_matrix(chip, diagonal_coupling)
     
     B_inv = np.linalg.inv(B)
     
@@ -47,44 +119,155 @@ def precompute_thermal_matrix():
     
     return B_inv, T_const
 
-B_inv, T_const = precompute_thermal_matrix()
-
-def getTSPD(A):
-    P = np.zeros(NUM_CORES)
-    for j in range(NUM_CORES):
-        if A[j] == 1:  # Active core
-            core_info = PER_CORE[j]
-            heat_factor = 1.0 + (core_info["fmax"] / 1e9) * 0.2
-            P[j] = core_info["alpha"] * heat_factor * 1.5
-        else:  # Idle core
-            P[j] = PER_CORE[j]["p_idle"] * 0.3
-    
-    T_core = np.dot(B_inv, P)
-    
-    T_total = T_core + T_const
-    
-    R = np.zeros(NUM_CORES)
-    for i in range(NUM_CORES):
-        if A[i] == 1:
-            numerator = T_DTM - T_const[i]
-            for j in range(NUM_CORES):
-                if A[j] == 0:
-                    numerator -= B_inv[i, j] * PER_CORE[j]["p_idle"] * 0.3
-            
-            denominator = 0
-            for j in range(NUM_CORES):
-                if A[j] == 1:
-                    denominator += B_inv[i, j] * PER_CORE[j]["alpha"] * 1.5
-            
-            if denominator > 1e-10 and numerator > 0:
-                R[i] = numerator / denominator
-            else:
-                R[i] = 0
-        else:
-            R[i] = float('inf')
+def build_thermal_solver(chip=None, diagonal_coupling=False):
+    chip = chip or DEFAULT_CHIP
+    if chip.thermal_mode == "sparse":
+        B, G = sparse_thermal_matrix(chip, chip.coupling_tol, diagonal_coupling)
+        solver = SparseThermalSolver(B)
+        return solver, T_AMB * solver.apply(G)
     
+    key = thermal_cache_key(chip, THERMAL_BUILDERS, diagonal_coupling)
+    cached = load_thermal_state(key)
+    if cached is not None:
+        B_inv, T_const = cached
+        return DenseThermalSolver(B_inv=B_inv), T_const
+    
+    B, G = thermal_matrix(chip, diagonal_coupling)
+    solver = DenseThermalSolver(B)
+    T_const = T_AMB * solver.apply(G)
+    save_thermal_state(key, solver.B_inv, T_const)
+    return solver, T_const
+
+def tspd_from_terms(numerator, denominator, active):
+    valid = active & (denominator > 1e-10) & (numerator > 0)
+    R = np.zeros(active.shape)
+    np.divide(numerator, denominator, out=R, where=valid)
+    R[~active] = float('inf')
     return R
 
+# ------------------- Thermal engine -------------------
+# The one owner of a chip's thermal state (solver for B^-1 and T_const, plus
+# B itself on demand). Policies reach it through chip.engine / get_engine(),
+# the visualisation scripts use the same instance, so both describe the
+# same chip. diagonal_coupling selects the conductance variant (see
+# thermal_matrix); chip.engine uses the policies' variant.
+class ThermalEngine:
+    def __init__(self, chip=None, diagonal_coupling=False):
+        self.chip = chip or DEFAULT_CHIP
+        self.diagonal_coupling = diagonal_coupling
+        self.per_core = self.chip.per_core
+        self.cores = self.chip.cores
+        self.grid_w = self.chip.grid_w
+        self.grid_h = self.chip.grid_h
+        self.num_cores = self.chip.num_cores
+        self.T_dtm = T_DTM
+        self.T_amb = T_AMB
+        
+        self.solver, self.T_const = build_thermal_solver(self.chip, diagonal_coupling)
+        self._B = None
+    
+    @property
+    def B_inv(self):
+        if self.chip.thermal_mode != "dense":
+            raise ValueError(f"{self.chip.name} uses the sparse thermal solver and has no explicit B_inv")
+        return self.solver.B_inv
+    
+    def get_core_position(self, core_id):
+        return self.chip.core_xy(core_id)
+    
+    def get_thermal_matrix(self):
+        if self._B is None:
+            if self.chip.thermal_mode == "sparse":
+                self._B, _ = sparse_thermal_matrix(self.chip, self.chip.coupling_tol, self.diagonal_coupling)
+            else:
+                self._B, _ = thermal_matrix(self.chip, self.diagonal_coupling)
+        return self._B
+    
+    def tspd(self, A):
+        chip = self.chip
+        active = np.asarray(A) == 1
+        if chip.thermal_mode == "dense" and kernels.enabled():
+            return kernels.tspd_dense(self.solver.B_inv, T_DTM - self.T_const, chip.idle_power,
+                                      chip.active_weight, active)
+        
+        numerator = T_DTM - self.T_const - self.solver.apply(np.where(active, 0.0, chip.idle_power))
+        denominator = self.solver.apply(np.where(active, chip.active_weight, 0.0))
+        
+        return tspd_from_terms(numerator, denominator, active)
+    
+    def tspd_batch(self, A_batch):
+        chip = self.chip
+        active = np.asarray(A_batch) == 1
+        
+        numerator = T_DTM - self.T_const - self.solver.apply_rows(np.where(active, 0.0, chip.idle_power))
+        denominator = self.solver.apply_rows(np.where(active, chip.active_weight, 0.0))
+        
+        return tspd_from_terms(numerator, denominator, active)
+    
+    def rho(self, A):
+        return global_TSPD_budget(self.tspd(A))
+    
+    # Power of each core in a (K x num_cores) batch of mappings: idle cores
+    # leak 0.3*p_idle, active ones add 1.5*alpha*(F/fmax)**3.5.
+    def power_batch(self, A_batch, F_batch):
+        cores = self.chip.cores
+        active = np.asarray(A_batch) != 0
+        F_batch = np.asarray(F_batch, dtype=float)
+        
+        power_density = np.zeros(active.shape)
+        runs = active & (cores.fmax > 0) & (F_batch > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.multiply(cores.alpha, np.power(F_batch / cores.fmax, 3.5), out=power_density, where=runs)
+        
+        return cores.p_idle * 0.3 + power_density * 1.5
+    
+    # Steady-state temperatures of a (K x num_cores) batch, with one solve
+    # (one B_inv matmul on a dense chip) for all K power vectors.
+    def temperatures_batch(self, A_batch, F_batch):
+        return self.solver.apply_rows(self.power_batch(A_batch, F_batch)) + self.T_const
+    
+    def power(self, A, F):
+        return self.power_batch(np.asarray(A)[None, :], np.asarray(F, dtype=float)[None, :])[0]
+    
+    def temperatures(self, A, F):
+        return self.temperatures_batch(np.asarray(A)[None, :], np.asarray(F, dtype=float)[None, :])[0]
+    
+    # Names used by the visualisation scripts.
+    calculate_temperatures = temperatures
+    
+    def calculate_tspd(self, A):
+        return self.rho(A)
+    
+    def get_core_relationships(self, core_id):
+        B = self.get_thermal_matrix()
+        row = B.getrow(core_id).toarray().ravel() if hasattr(B, 'getrow') else B[core_id]
+        
+        relationships = []
+        for other_id in np.flatnonzero(np.abs(row) > 0.01):
+            if other_id != core_id:
+                relationships.append({
+                    'core_id': int(other_id),
+                    'conductance': abs(row[other_id]),
+                    'position': self.get_core_position(int(other_id))
+                })
+        
+        relationships.sort(key=lambda x: x['conductance'], reverse=True)
+        return relationships
+
+def get_engine(chip=None):
+    return (chip or DEFAULT_CHIP).engine
+
+# Thermal state of the default 52-core chip, kept for existing callers as
+# lazy module attributes (models.thermal.B_inv, .T_const): importing this
+# module builds nothing, the chip's engine is built on first use.
+def __getattr__(name):
+    if name in ("B_inv", "T_const"):
+        return getattr(DEFAULT_CHIP, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def getTSPD(A, chip=None):
+    return get_engine(chip).tspd(A)
+
 def global_TSPD_budget(R):
     if hasattr(R, 'tolist'):
         R_list = R.tolist()
@@ -94,61 +277,118 @@ def global_TSPD_budget(R):
     finite_vals = [val for val in R_list if val != float('inf') and val > 0]
     return min(finite_vals) if finite_vals else 0.0
 
-def dvfs_from_budget(A, rho_star):
-    F = [0.0] * NUM_CORES
-    for i, a in enumerate(A):
-        if a == 0:
-            continue
-            
-        core_info = PER_CORE[i]
-        f_max = core_info["fmax"]
-        alpha = core_info["alpha"]
-        
-        max_power_density = min(rho_star, alpha)
-        
-        if alpha > 0:
-            scale = (max_power_density / alpha) ** 0.4
-            F[i] = scale * f_max
-        else:
-            F[i] = 0
-    
-    return F
-
-def throughput(A, F):
-    total_throughput = 0.0
-    for i, a in enumerate(A):
-        if a == 0:
-            continue
-            
-        core_info = PER_CORE[i]
-        f_max = core_info["fmax"]
-        sum_task_time = core_info["sum_task_time"]
-        
-        if f_max > 0 and sum_task_time > 0 and F[i] > 0:
-            scaled_execution_time = sum_task_time * (f_max / F[i])
-            core_throughput = 1.0 / scaled_execution_time
-            total_throughput += core_throughput
-    
-    return total_throughput
-
-def predict_temps(A, F):
-    P = np.zeros(NUM_CORES)
-    for j in range(NUM_CORES):
-        if A[j] == 0:
-            P[j] = PER_CORE[j]["p_idle"] * 0.3
-        else:
-            core_info = PER_CORE[j]
-            f_max = core_info["fmax"]
-            alpha = core_info["alpha"]
-            
-            if f_max > 0 and F[j] > 0:
-                power_density = alpha * (F[j] / f_max) ** 3.5
-            else:
-                power_density = 0
-                
-            P[j] = PER_CORE[j]["p_idle"] * 0.3 + power_density * 1.5
+# Single-mapping forms of the batched kernels below.
+def dvfs_from_budget(A, rho_star, chip=None):
+    return dvfs_from_budget_batch(np.asarray(A)[None, :], np.array([rho_star], dtype=float), chip)[0].tolist()
+
+def throughput(A, F, chip=None):
+    return float(throughput_batch(np.asarray(A)[None, :], np.asarray(F, dtype=float)[None, :], chip)[0])
+
+def predict_temps(A, F, chip=None):
+    return get_engine(chip).temperatures(A, F)
+
+# Temperature error of a sparse chip against the same floorplan solved with
+# the dense inverse, over random mappings run at their DVFS frequencies.
+def sparse_temperature_error(chip, num_samples=16, density=0.5, seed=0):
+    from models.chip import Chip
+    
+    dense_chip = Chip(chip.grid_w, chip.grid_h, chip.core_types, chip.core_info,
+                      name=f"{chip.name}-dense", thermal_mode="dense")
+    rng = np.random.default_rng(seed)
+    
+    errors = []
+    for _ in range(num_samples):
+        A = (rng.random(chip.num_cores) < density).astype(int).tolist()
+        F = dvfs_from_budget(A, global_TSPD_budget(getTSPD(A, dense_chip)), dense_chip)
+        errors.append(np.abs(predict_temps(A, F, chip) - predict_temps(A, F, dense_chip)))
+    errors = np.concatenate(errors)
+    
+    return {
+        'max_abs_error': float(errors.max()),
+        'mean_abs_error': float(errors.mean()),
+        'nnz': getattr(chip.solver, 'nnz', chip.num_cores ** 2),
+        'density': getattr(chip.solver, 'nnz', chip.num_cores ** 2) / chip.num_cores ** 2
+    }
+
+# ------------------- Batched evaluation -------------------
+def getTSPD_batch(A_batch, chip=None):
+    return get_engine(chip).tspd_batch(A_batch)
+
+def global_TSPD_budget_batch(R_batch):
+    R_batch = np.asarray(R_batch)
+    finite = np.where(np.isfinite(R_batch) & (R_batch > 0), R_batch, np.inf)
+    rho = finite.min(axis=1)
+    rho[np.isinf(rho)] = 0.0
+    return rho
+
+# Frequencies (K x num_cores) of a batch of mappings under their budgets
+# rho (K,): active cores run at (min(rho, alpha)/alpha)**0.4 * fmax, idle
+# ones at 0.
+def dvfs_from_budget_batch(A_batch, rho, chip=None):
+    chip = chip or DEFAULT_CHIP
+    cores = chip.cores
+    active = np.asarray(A_batch) != 0
     
-    T_core = np.dot(B_inv, P)
-    T_total = T_core + T_const
+    max_power_density = np.minimum(np.asarray(rho, dtype=float)[:, None], cores.alpha)
+    scale = np.zeros(active.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.power(max_power_density / cores.alpha, 0.4, out=scale, where=active & (cores.alpha > 0))
+    return scale * cores.fmax
+
+# Throughput (K,) of a batch of mappings at frequencies F_batch: the sum
+# over active cores of F / (sum_task_time * fmax).
+def throughput_batch(A_batch, F_batch, chip=None):
+    chip = chip or DEFAULT_CHIP
+    cores = chip.cores
+    active = np.asarray(A_batch) != 0
+    F_batch = np.asarray(F_batch, dtype=float)
+    
+    runs = active & (F_batch > 0) & (cores.fmax > 0) & (cores.sum_task_time > 0)
+    core_throughput = np.zeros(active.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(1.0, cores.sum_task_time * (cores.fmax / F_batch), out=core_throughput, where=runs)
+    
+    # Accumulate left to right; np.sum's pairwise order would let same-type
+    # swaps show up as spurious 1e-13 gains.
+    if core_throughput.shape[1] == 0:
+        return np.zeros(len(core_throughput))
+    return np.cumsum(core_throughput, axis=1)[:, -1]
+
+def predict_temps_batch(A_batch, F_batch, chip=None):
+    return get_engine(chip).temperatures_batch(A_batch, F_batch)
+
+def dvfs_and_throughput_batch(active, rho, chip=None):
+    F = dvfs_from_budget_batch(active, rho, chip)
+    return F, throughput_batch(active, F, chip)
+
+# Scores a stacked (K x num_cores) activity matrix in one pass and returns
+# rho (K,), F (K x num_cores) and throughput (K,), row-for-row equal to
+# getTSPD -> global_TSPD_budget -> dvfs_from_budget -> throughput.
+def evaluate_mappings(A_batch, chip=None):
+    active = np.asarray(A_batch) == 1
+    rho = global_TSPD_budget_batch(getTSPD_batch(active, chip))
+    F, tp = dvfs_and_throughput_batch(active, rho, chip)
+    return rho, F, tp
+
+
+# ------------------- Mapping cache -------------------
+TSPD_CACHE = DEFAULT_CHIP.mapping_cache
+
+# Full (R, rho, F, throughput) evaluation of one mapping, memoised on its
+# bitmask. R is returned read-only and F as a fresh list, so callers cannot
+# corrupt cached entries.
+def evaluate_mapping(A, chip=None, cache=None):
+    chip = chip or DEFAULT_CHIP
+    cache = cache or chip.mapping_cache
+    key = mapping_key(A)
+    entry = cache.get(key)
+    if entry is None:
+        R = getTSPD(A, chip)
+        R.setflags(write=False)
+        rho = global_TSPD_budget(R)
+        F = dvfs_from_budget(A, rho, chip)
+        entry = (R, rho, tuple(F), throughput(A, F, chip))
+        cache.put(key, entry)
     
-    return T_total
\ No newline at end of file
+    R, rho, F, tp = entry
+    return R, rho, list(F), tp
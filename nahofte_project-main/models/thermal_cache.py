@@ -0,0 +1,53 @@
+import hashlib
+import inspect
+import json
+import os
+import numpy as np
+from config import T_AMB, THERMAL_CACHE_DIR
+
+# Content-addressed store for the dense thermal state. The key hashes
+# everything B and G are built from: the floorplan, T_AMB, and the source
+# of the functions that build them, so editing the model invalidates old
+# entries without any manual version bump.
+def thermal_cache_key(chip, builders=(), diagonal_coupling=False):
+    spec = {
+        'grid_w': chip.grid_w,
+        'grid_h': chip.grid_h,
+        'core_types': chip.core_types,
+        'thermal_mode': chip.thermal_mode,
+        'diagonal_coupling': diagonal_coupling,
+        'T_AMB': T_AMB,
+        'builders': [inspect.getsource(f) for f in builders]
+    }
+    blob = json.dumps(spec, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+def _paths(key, cache_dir):
+    return (os.path.join(cache_dir, f"{key}.B_inv.npy"),
+            os.path.join(cache_dir, f"{key}.T_const.npy"))
+
+# B_inv is memory-mapped read-only, so concurrent worker processes share
+# the page cache instead of each holding a private N x N copy.
+def load_thermal_state(key, cache_dir=THERMAL_CACHE_DIR):
+    if not cache_dir:
+        return None
+    B_inv_path, T_const_path = _paths(key, cache_dir)
+    try:
+        return np.load(B_inv_path, mmap_mode='r'), np.load(T_const_path)
+    except (OSError, ValueError):
+        return None
+
+def save_thermal_state(key, B_inv, T_const, cache_dir=THERMAL_CACHE_DIR):
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for path, array in zip(_paths(key, cache_dir), (B_inv, T_const)):
+            # Write then rename, so a concurrent reader never sees a
+            # half-written file.
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write thermal cache {key}: {e}")
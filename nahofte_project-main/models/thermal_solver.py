@@ -0,0 +1,68 @@
+import numpy as np
+
+# Everything downstream of the thermal matrix only ever needs B^-1 applied to
+# power vectors (getTSPD, predict_temps) or single columns of B^-1
+# (TSPDState). The solvers below provide exactly that, either from an
+# explicit dense inverse or from a sparse LU factorisation of B.
+
+class DenseThermalSolver:
+    def __init__(self, B=None, B_inv=None):
+        self.B_inv = np.linalg.inv(B) if B_inv is None else B_inv
+        self.num_cores = self.B_inv.shape[0]
+        self._cols = None
+    
+    # Columns of B_inv stored as contiguous rows, for rank-1 updates.
+    @property
+    def cols(self):
+        if self._cols is None:
+            self._cols = np.ascontiguousarray(self.B_inv.T)
+        return self._cols
+    
+    def apply(self, x):
+        return np.dot(self.B_inv, x)
+    
+    def apply_rows(self, X):
+        return np.dot(X, self.B_inv.T)
+    
+    def columns(self, idx):
+        return self.cols[idx]
+    
+    def column(self, j):
+        return self.cols[j]
+
+class SparseThermalSolver:
+    def __init__(self, B):
+        from scipy.sparse.linalg import splu
+        
+        self.num_cores = B.shape[0]
+        self.nnz = B.nnz
+        self.lu = splu(B.tocsc())
+        self._cols = {}
+    
+    def apply(self, x):
+        return self.lu.solve(np.asarray(x, dtype=float))
+    
+    def apply_rows(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.shape[0] == 0:
+            return np.zeros(X.shape)
+        return self.lu.solve(np.ascontiguousarray(X.T)).T
+    
+    # Columns of B^-1 are solved on demand, in one multi-RHS solve for all
+    # missing indices, and kept: a policy run only touches the columns of
+    # cores that actually take part in a candidate migration.
+    def columns(self, idx):
+        idx = np.atleast_1d(np.asarray(idx, dtype=int))
+        missing = [j for j in dict.fromkeys(idx.tolist()) if j not in self._cols]
+        if missing:
+            E = np.zeros((self.num_cores, len(missing)))
+            E[missing, np.arange(len(missing))] = 1.0
+            solved = self.lu.solve(E)
+            for k, j in enumerate(missing):
+                self._cols[j] = solved[:, k].copy()
+        if not len(idx):
+            return np.zeros((0, self.num_cores))
+        return np.stack([self._cols[j] for j in idx.tolist()])
+    
+    def column(self, j):
+        return self.columns([j])[0]
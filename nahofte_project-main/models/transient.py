@@ -0,0 +1,144 @@
+import numpy as np
+from config import T_DTM, T_AMB, CORE_HEAT_CAPACITY, TRANSIENT_DT
+from models.chip import DEFAULT_CHIP
+from models.thermal import get_engine, ambient_conductance, evaluate_mapping
+from models.migration import apply_migration
+
+# Lumped RC model on the same conductances as the steady-state engine:
+#
+#   C dT/dt = P + T_AMB*G - B T        (steady state: T = B_inv P + T_const)
+#
+# B is symmetric positive definite and C diagonal, so C^-1 B has real
+# positive modes: with C^-1/2 B C^-1/2 = Q diag(lam) Q^T and V = C^-1/2 Q,
+#
+#   T_k - T_ss = V diag(mu**k) V^-1 (T_0 - T_ss)
+#
+# where mu = exp(-lam*dt) for the exact exponential propagator or
+# 1/(1 + lam*dt) for implicit Euler. One step is one mat-vec, and a block of
+# n steps at constant power is a single (n x N) @ (N x N) product.
+class TransientSimulator:
+    def __init__(self, chip=None, dt=TRANSIENT_DT, heat_capacity=CORE_HEAT_CAPACITY,
+                 method="exponential", block_size=4096):
+        if method not in ("exponential", "implicit"):
+            raise ValueError(f"Unknown integration method: {method}")
+
+        self.chip = chip or DEFAULT_CHIP
+        self.engine = get_engine(self.chip)
+        self.dt = dt
+        self.method = method
+        self.block_size = block_size
+
+        B = self.engine.get_thermal_matrix()
+        B = B.toarray() if hasattr(B, 'toarray') else np.asarray(B)
+        self.G = ambient_conductance(self.chip)
+
+        C = np.broadcast_to(np.asarray(heat_capacity, dtype=float), (self.chip.num_cores,))
+        scale = 1.0 / np.sqrt(C)
+        lam, Q = np.linalg.eigh(scale[:, None] * B * scale[None, :])
+
+        self.rates = lam
+        self.V = scale[:, None] * Q
+        self.V_inv = Q.T * np.sqrt(C)[None, :]
+        self.mu = np.exp(-lam * dt) if method == "exponential" else 1.0 / (1.0 + lam * dt)
+
+        # mu**k for k = 1..block_size, reused by every block of every segment.
+        self._mu_pows = self.mu[None, :] ** np.arange(1, block_size + 1)[:, None]
+        self._Phi = None
+
+    # Dense one-step propagator, for callers that step one dt at a time.
+    @property
+    def Phi(self):
+        if self._Phi is None:
+            self._Phi = (self.V * self.mu[None, :]) @ self.V_inv
+        return self._Phi
+
+    def steady_state(self, P):
+        return self.engine.solver.apply(np.asarray(P, dtype=float) + T_AMB * self.G)
+
+    def step(self, T, P):
+        T_ss = self.steady_state(P)
+        return T_ss + self.Phi @ (np.asarray(T) - T_ss)
+
+    # Integrates num_steps at constant power P from T0 and returns running
+    # statistics (peak per core, steps with any core above t_limit, final
+    # temperatures). With record=True the full (num_steps x N) trace is
+    # returned as well.
+    def run(self, T0, P, num_steps, t_limit=T_DTM, record=False):
+        T_ss = self.steady_state(P)
+        modes = self.V_inv @ (np.asarray(T0, dtype=float) - T_ss)
+
+        peak = np.array(T0, dtype=float)
+        steps_above = 0
+        core_steps_above = np.zeros(self.chip.num_cores, dtype=int)
+        trace = [] if record else None
+
+        done = 0
+        while done < num_steps:
+            n = min(self.block_size, num_steps - done)
+            T_block = (self._mu_pows[:n] * modes[None, :]) @ self.V.T + T_ss
+
+            np.maximum(peak, T_block.max(axis=0), out=peak)
+            above = T_block > t_limit
+            steps_above += int(above.any(axis=1).sum())
+            core_steps_above += above.sum(axis=0)
+            if record:
+                trace.append(T_block)
+
+            modes = modes * self._mu_pows[n - 1]
+            done += n
+
+        final = self.V @ modes + T_ss if num_steps else np.array(T0, dtype=float)
+
+        result = {
+            'peak': peak,
+            'steps_above': steps_above,
+            'core_steps_above': core_steps_above,
+            'final': final
+        }
+        if record:
+            result['trace'] = np.concatenate(trace) if trace else np.zeros((0, self.chip.num_cores))
+        return result
+
+    # Replays a policy's migration sequence from the initial mapping A0: the
+    # chip starts at the steady state of A0, and each migration switches the
+    # power map (frequencies re-derived from the new TSPD budget) and is
+    # followed by interval_steps at that mapping.
+    def replay(self, A0, migrations, interval_steps=1000, t_limit=T_DTM, record=False):
+        A = list(A0)
+        _, _, F, _ = evaluate_mapping(A, self.chip)
+        T = self.steady_state(self.engine.power(A, F))
+
+        peak = T.copy()
+        steady_peak = float(T.max())
+        steps_above = 0
+        core_steps_above = np.zeros(self.chip.num_cores, dtype=int)
+        traces = []
+
+        for s, d in migrations:
+            A = apply_migration(A, s, d)
+            _, _, F, _ = evaluate_mapping(A, self.chip)
+            P = self.engine.power(A, F)
+            steady_peak = max(steady_peak, float(self.steady_state(P).max()))
+
+            segment = self.run(T, P, interval_steps, t_limit, record)
+            np.maximum(peak, segment['peak'], out=peak)
+            steps_above += segment['steps_above']
+            core_steps_above += segment['core_steps_above']
+            if record:
+                traces.append(segment['trace'])
+            T = segment['final']
+
+        result = {
+            'A': A,
+            'F': F,
+            'peak_temperature': float(peak.max()),
+            'peak_per_core': peak,
+            'steady_state_peak': steady_peak,
+            'time_above_T_DTM': steps_above * self.dt,
+            'core_time_above_T_DTM': core_steps_above * self.dt,
+            'duration': len(migrations) * interval_steps * self.dt,
+            'final_temperatures': T
+        }
+        if record:
+            result['trace'] = np.concatenate(traces) if traces else np.zeros((0, self.chip.num_cores))
+        return result
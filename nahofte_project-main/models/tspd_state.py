@@ -0,0 +1,262 @@
+import numpy as np
+from config import T_DTM
+from models.chip import DEFAULT_CHIP
+from models.thermal import tspd_from_terms, global_TSPD_budget_batch, dvfs_and_throughput_batch
+from models import kernels
+
+# getTSPD keeps, for every core i,
+#   numerator[i]   = T_DTM - T_const[i] - sum_{j idle}   B_inv[i, j] * idle_power[j]
+#   denominator[i] =                      sum_{j active} B_inv[i, j] * active_weight[j]
+# Flipping core j between idle and active only moves column j of B_inv in or
+# out of those sums, so a migration s->d is two O(N) column updates instead
+# of a full O(N^2) rebuild.
+#
+# Candidates are scored in chunks of at most MAX_BATCH_ELEMENTS
+# (candidates x cores) so large chips do not materialise every candidate
+# mapping at once. With the compiled kernels enabled (models/kernels.py)
+# rho scoring runs candidate by candidate instead, without temporaries and,
+# where only the best or first good candidate matters, with an early exit.
+MAX_BATCH_ELEMENTS = 1 << 22
+
+class TSPDState:
+    def __init__(self, A, chip=None):
+        self.chip = chip = chip or DEFAULT_CHIP
+        self.active = np.asarray(A) == 1
+        self.refresh()
+    
+    # Rebuilds both sums from scratch; long-running callers use this to drop
+    # the rounding drift of many incremental updates.
+    def refresh(self):
+        chip = self.chip
+        self.numerator = T_DTM - chip.T_const - chip.solver.apply(np.where(self.active, 0.0, chip.idle_power))
+        self.denominator = chip.solver.apply(np.where(self.active, chip.active_weight, 0.0))
+        self._heat = None
+    
+    def copy(self):
+        other = TSPDState.__new__(TSPDState)
+        other.chip = self.chip
+        other.active = self.active.copy()
+        other.numerator = self.numerator.copy()
+        other.denominator = self.denominator.copy()
+        other._heat = None if self._heat is None else self._heat.copy()
+        return other
+    
+    def R(self):
+        return tspd_from_terms(self.numerator, self.denominator, self.active)
+    
+    def rho(self):
+        return float(global_TSPD_budget_batch(self.R()[None, :])[0])
+    
+    def _candidates(self, src, dst):
+        chip = self.chip
+        solver, idle_power, active_weight = chip.solver, chip.idle_power, chip.active_weight
+        src = np.asarray(src, dtype=int)
+        dst = np.asarray(dst, dtype=int)
+        rows = np.arange(len(dst))
+        
+        active = np.tile(self.active, (len(dst), 1))
+        active[rows, dst] = True
+        dst_cols = solver.columns(dst)
+        numerator = self.numerator + dst_cols * idle_power[dst, None]
+        denominator = self.denominator + dst_cols * active_weight[dst, None]
+        
+        if len(src):
+            active[rows, src] = False
+            src_cols = solver.columns(src)
+            numerator -= src_cols * idle_power[src, None]
+            denominator -= src_cols * active_weight[src, None]
+        
+        return active, tspd_from_terms(numerator, denominator, active)
+    
+    # B_inv columns for the compiled kernels: cols[slot[j]] is column j.
+    def _kernel_columns(self, src, dst):
+        solver = self.chip.solver
+        if hasattr(solver, 'cols'):
+            return solver.cols, np.arange(self.chip.num_cores)
+        cores = np.unique(np.concatenate([np.asarray(src, dtype=int), np.asarray(dst, dtype=int)]))
+        slot = np.full(self.chip.num_cores, -1)
+        slot[cores] = np.arange(len(cores))
+        return solver.columns(cores), slot
+    
+    def _kernel_args(self, src, dst):
+        cols, slot = self._kernel_columns(src, dst)
+        return (self.numerator, self.denominator, self.active, cols, slot,
+                self.chip.idle_power, self.chip.active_weight)
+    
+    def _chunks(self, count):
+        size = max(1, MAX_BATCH_ELEMENTS // self.chip.num_cores)
+        for start in range(0, max(count, 1), size):
+            yield slice(start, start + size)
+    
+    def score_activations(self, dst):
+        dst = np.asarray(dst, dtype=int)
+        if kernels.enabled():
+            src = np.full(len(dst), -1)
+            return kernels.score_pairs(*self._kernel_args(dst[:0], dst), src, dst)
+        return np.concatenate([global_TSPD_budget_batch(self._candidates([], dst[part])[1])
+                               for part in self._chunks(len(dst))])
+    
+    def score_migrations(self, src, dst):
+        src = np.asarray(src, dtype=int)
+        dst = np.asarray(dst, dtype=int)
+        if kernels.enabled():
+            return kernels.score_pairs(*self._kernel_args(src, dst), src, dst)
+        return np.concatenate([global_TSPD_budget_batch(self._candidates(src[part], dst[part])[1])
+                               for part in self._chunks(len(dst))])
+    
+    # Index and rho of the best migration, the first one on ties, as
+    # np.argmax over score_migrations would pick it.
+    def best_migration(self, src, dst):
+        if kernels.enabled():
+            return kernels.best_pair(*self._kernel_args(src, dst), src, dst)
+        rho = self.score_migrations(src, dst)
+        best = int(np.argmax(rho))
+        return best, float(rho[best])
+    
+    # First migration s -> d, taking sources in the order of S and same-type
+    # destinations in the order of D, whose rho beats rho0 by more than
+    # threshold. Returns (s, d, rho, candidates scored), s = d = -1 if no
+    # candidate qualifies.
+    def first_improving_migration(self, S, D, rho0, threshold):
+        type_id = self.chip.type_id
+        S = np.asarray(S, dtype=int)
+        D = np.asarray(D, dtype=int)
+        if kernels.enabled():
+            args = self._kernel_args(S, D)
+            return kernels.first_improving(*args, type_id, S, D, rho0, threshold)
+        
+        scanned = 0
+        for s in S.tolist():
+            D_s = D[type_id[D] == type_id[s]]
+            if not len(D_s):
+                continue
+            rho_s = self.score_migrations(np.full(len(D_s), s), D_s)
+            scanned += len(D_s)
+            accepted = np.flatnonzero(rho_s - rho0 > threshold)
+            if len(accepted):
+                k = accepted[0]
+                return s, int(D_s[k]), float(rho_s[k]), scanned
+        return -1, -1, 0.0, scanned
+    
+    # rho and throughput without keeping the (candidates x cores) F matrix.
+    def score_throughput(self, src, dst):
+        src = np.asarray(src, dtype=int)
+        dst = np.asarray(dst, dtype=int)
+        rho, tp = [], []
+        for part in self._chunks(len(dst)):
+            active, R = self._candidates(src[part], dst[part])
+            rho_part = global_TSPD_budget_batch(R)
+            rho.append(rho_part)
+            tp.append(dvfs_and_throughput_batch(active, rho_part, self.chip)[1])
+        return np.concatenate(rho), np.concatenate(tp)
+    
+    def evaluate_migrations(self, src, dst):
+        src = np.asarray(src, dtype=int)
+        dst = np.asarray(dst, dtype=int)
+        rho, F, tp = [], [], []
+        for part in self._chunks(len(dst)):
+            active, R = self._candidates(src[part], dst[part])
+            rho_part = global_TSPD_budget_batch(R)
+            F_part, tp_part = dvfs_and_throughput_batch(active, rho_part, self.chip)
+            rho.append(rho_part)
+            F.append(F_part)
+            tp.append(tp_part)
+        return np.concatenate(rho), np.concatenate(F), np.concatenate(tp)
+    
+    # predict_temps without a solve per mapping. Every core draws idle_power
+    # and an active one also active_weight * (F/fmax)**3.5, where F/fmax
+    # depends only on rho and the core's type. So
+    #   T = T_const + B_inv idle_power + sum_t (F/fmax)_t**3.5 * heat[t]
+    # with heat[t] = B_inv (active_weight on the active cores of type t),
+    # and a migration s->d only moves heat[type of s] by two columns: a
+    # candidate's temperatures cost O(types * N) instead of an O(N^2) solve.
+    # heat is built on first use and then kept up to date like the sums.
+    def _heat_terms(self):
+        if self._heat is None:
+            chip = self.chip
+            on = np.flatnonzero(self.active)
+            weights = np.zeros((chip.cores.num_types, chip.num_cores))
+            weights[chip.type_id[on], on] = chip.active_weight[on]
+            self._heat = chip.solver.apply_rows(weights)
+            self._idle_temps = chip.T_const + chip.solver.apply(chip.idle_power)
+        return self._idle_temps, self._heat
+    
+    # F/fmax per core type (K x types) at budgets rho (K,), as
+    # dvfs_from_budget_batch computes it.
+    def _speed(self, rho):
+        cores = self.chip.cores
+        alpha = np.zeros(cores.num_types)
+        fmax = np.zeros(cores.num_types)
+        alpha[cores.type_id] = cores.alpha
+        fmax[cores.type_id] = cores.fmax
+        
+        rho = np.asarray(rho, dtype=float)[:, None]
+        speed = np.zeros((len(rho), cores.num_types))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.power(np.minimum(rho, alpha) / alpha, 0.4, out=speed, where=(alpha > 0) & (rho > 0))
+        return speed * (fmax > 0)
+    
+    # Throughput at budgets rho (K,) of any mapping with as many active
+    # cores of every type as this one, e.g. after a same-type migration:
+    # an active core contributes F/fmax / sum_task_time, the same for every
+    # core of a type. Equal to throughput_batch up to summation order.
+    def throughput_at(self, rho):
+        cores = self.chip.cores
+        counts = np.bincount(cores.type_id[self.active], minlength=cores.num_types)
+        sum_task_time = np.zeros(cores.num_types)
+        sum_task_time[cores.type_id] = cores.sum_task_time
+        weight = np.zeros(cores.num_types)
+        np.divide(counts, sum_task_time, out=weight, where=sum_task_time > 0)
+        return self._speed(rho) @ weight
+    
+    def temperatures(self, rho):
+        idle_temps, heat = self._heat_terms()
+        return idle_temps + np.power(self._speed([rho])[0], 3.5) @ heat
+    
+    def _candidate_temps(self, src, dst, rho):
+        chip = self.chip
+        idle_temps, heat = self._heat_terms()
+        scale = np.power(self._speed(rho), 3.5)
+        moved = (chip.solver.columns(dst) * chip.active_weight[dst, None]
+                 - chip.solver.columns(src) * chip.active_weight[src, None])
+        own_scale = scale[np.arange(len(dst)), chip.type_id[dst]]
+        return idle_temps + scale @ heat + own_scale[:, None] * moved
+    
+    # Standard deviation of the predicted temperatures after each migration
+    # src[k] -> dst[k], at the candidates' budgets rho[k].
+    def score_spread(self, src, dst, rho):
+        src = np.asarray(src, dtype=int)
+        dst = np.asarray(dst, dtype=int)
+        rho = np.asarray(rho, dtype=float)
+        return np.concatenate([self._candidate_temps(src[part], dst[part], rho[part]).std(axis=1)
+                               for part in self._chunks(len(dst))])
+    
+    def commit(self, s, d):
+        chip = self.chip
+        solver, idle_power, active_weight = chip.solver, chip.idle_power, chip.active_weight
+        col_s, col_d = solver.column(s), solver.column(d)
+        self.active[s] = False
+        self.active[d] = True
+        self.numerator += col_d * idle_power[d] - col_s * idle_power[s]
+        self.denominator += col_d * active_weight[d] - col_s * active_weight[s]
+        if self._heat is not None:
+            self._heat[chip.type_id[d]] += col_d * active_weight[d]
+            self._heat[chip.type_id[s]] -= col_s * active_weight[s]
+    
+    # Single-core flips, for mappings that change by tasks starting or
+    # finishing rather than by migrations.
+    def activate(self, d):
+        col = self.chip.solver.column(d)
+        self.active[d] = True
+        self.numerator += col * self.chip.idle_power[d]
+        self.denominator += col * self.chip.active_weight[d]
+        if self._heat is not None:
+            self._heat[self.chip.type_id[d]] += col * self.chip.active_weight[d]
+    
+    def deactivate(self, s):
+        col = self.chip.solver.column(s)
+        self.active[s] = False
+        self.numerator -= col * self.chip.idle_power[s]
+        self.denominator -= col * self.chip.active_weight[s]
+        if self._heat is not None:
+            self._heat[self.chip.type_id[s]] -= col * self.chip.active_weight[s]
@@ -1,11 +1,12 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 import glob
 import os
+from utils.result_store import read_results_frame
 
 def create_figure4_visualizations():
-    result_files = glob.glob("results_policies8.csv")
+    import matplotlib.pyplot as plt
+    
+    result_files = glob.glob("results_policies8.csv") + glob.glob("results_policies8.results")
     if not result_files:
         print("No results files found. Run main.py first.")
         return
@@ -13,7 +14,8 @@ def create_figure4_visualizations():
     results_file = max(result_files, key=os.path.getctime)
     print(f"Using results file: {results_file}")
     
-    df = pd.read_csv(results_file)
+    df = read_results_frame(results_file, columns=['n_active', 'policy', 'throughput', 'rho',
+                                                   'migrations', 'throughput_gain'])
     
     df['percent_active'] = (df['n_active'] / 52) * 100
     
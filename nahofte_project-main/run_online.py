@@ -0,0 +1,30 @@
+import argparse
+from main import POLICIES
+from models.chip import load_chip
+from models.online import OnlineController, synthetic_events
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a migration policy online from a synthetic event stream.")
+    parser.add_argument("--policy", default="Proposed", choices=list(POLICIES))
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--arrival-prob", type=float, default=0.5)
+    parser.add_argument("--max-migs", type=int, default=1, help="migrations per decision step")
+    parser.add_argument("--budget-ms", type=float, default=None, help="per-event latency budget")
+    parser.add_argument("--chip", default=None, help="chip description JSON")
+    args = parser.parse_args()
+
+    budget = args.budget_ms / 1000 if args.budget_ms is not None else None
+    controller = OnlineController(args.policy, chip=load_chip(args.chip), max_migs=args.max_migs,
+                                  latency_budget=budget)
+    summary = controller.run(synthetic_events(controller, args.events, args.seed, args.arrival_prob))
+
+    print(f"{args.policy}: {summary['events']} events, {summary['migrations']} migrations, "
+          f"{summary['active_cores']} active cores, rho: {summary['rho']:.4f}")
+    latencies = ", ".join(f"p{p:g} {v*1e3:.3f} ms" for p, v in summary['latency_percentiles'].items())
+    print(f"Decision latency: {latencies}, max {summary['latency_max']*1e3:.3f} ms")
+    if budget is not None:
+        print(f"Over budget: {summary['over_budget']} events")
+
+if __name__ == "__main__":
+    main()
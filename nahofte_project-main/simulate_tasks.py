@@ -0,0 +1,32 @@
+import argparse
+from config import SEED
+from main import POLICIES, initial_mapping
+from models.chip import load_chip
+from models.task_sim import TaskSimulator
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate individual tasks from data/tasks.py on the chip.")
+    parser.add_argument("--policy", default=None, choices=list(POLICIES),
+                        help="policy taking a decision step after every task completion (default: none)")
+    parser.add_argument("--n-active", type=int, default=20)
+    parser.add_argument("--sample-id", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--copies", type=int, default=1, help="task catalogue copies per active core")
+    parser.add_argument("--no-steal", action="store_true", help="idle cores do not take waiting tasks")
+    parser.add_argument("--chip", default=None, help="chip description JSON")
+    args = parser.parse_args()
+
+    chip = load_chip(args.chip)
+    A0 = initial_mapping(args.n_active, args.sample_id, args.seed, chip.num_cores)
+    sim = TaskSimulator(A0, chip=chip, copies=args.copies, policy=args.policy, steal=not args.no_steal)
+    result = sim.run()
+
+    print(f"{result['completed']}/{result['tasks']} tasks, makespan {result['makespan']*1e3:.3f} ms, "
+          f"{result['events']} events")
+    print(f"Throughput: {result['throughput']:.1f} tasks/s, {result['set_throughput']:.2f} task sets/s "
+          f"(analytic: {result['analytic_throughput']:.2f})")
+    print(f"Migrations: {result['migrations']}, steals: {result['steals']}, "
+          f"energy: {result['energy']:.4f} J, peak temperature: {result['peak_temperature']:.2f}°C")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+from config import SEED, TRANSIENT_DT
+from main import POLICIES, initial_mapping
+from models.chip import load_chip
+from models.transient import TransientSimulator
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a policy's migrations through the transient thermal model.")
+    parser.add_argument("--policy", default="Proposed", choices=list(POLICIES))
+    parser.add_argument("--n-active", type=int, default=20)
+    parser.add_argument("--sample-id", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--chip", default=None, help="chip description JSON")
+    parser.add_argument("--dt", type=float, default=TRANSIENT_DT, help="time step in seconds")
+    parser.add_argument("--interval-steps", type=int, default=1000,
+                        help="time steps between consecutive migrations")
+    parser.add_argument("--method", default="exponential", choices=["exponential", "implicit"])
+    args = parser.parse_args()
+
+    chip = load_chip(args.chip)
+    A0 = initial_mapping(args.n_active, args.sample_id, args.seed, chip.num_cores)
+    data = POLICIES[args.policy](A0[:], chip=chip)
+
+    sim = TransientSimulator(chip, dt=args.dt, method=args.method)
+    result = sim.replay(A0, data["migration_sequence"], interval_steps=args.interval_steps)
+
+    print(f"{args.policy}: {data['migrations']} migrations over {result['duration']:.3f} s")
+    print(f"Peak temperature: {result['peak_temperature']:.2f}°C "
+          f"(steady-state peak {result['steady_state_peak']:.2f}°C)")
+    print(f"Time above T_DTM: {result['time_above_T_DTM']:.4f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,58 @@
 import csv
+import json
+import os
+
+FIELDNAMES = ['n_active', 'sample_id', 'policy', 'throughput', 'rho', 'migrations', 'throughput_gain']
 
 def save_results_csv(filename, results):
     with open(filename, 'w', newline='') as csvfile:
-        fieldnames = ['n_active', 'sample_id', 'policy', 'throughput', 'rho', 'migrations', 'throughput_gain']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
         
         writer.writeheader()
         for result in results:
-            writer.writerow(result)
\ No newline at end of file
+            writer.writerow(result)
+
+# Rows go in under the header already in the file, if there is one, so a
+# resumed sweep keeps its columns whatever fieldnames it is given now.
+def append_results_csv(filename, results, fieldnames=FIELDNAMES):
+    new_file = not os.path.exists(filename) or os.path.getsize(filename) == 0
+    if not new_file:
+        with open(filename, newline='') as csvfile:
+            fieldnames = next(csv.reader(csvfile), None) or fieldnames
+    
+    with open(filename, 'a', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        
+        if new_file:
+            writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+
+def append_jsonl(filename, records):
+    with open(filename, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def load_completed_keys(filename):
+    if not os.path.exists(filename):
+        return set()
+    
+    # A run killed mid-write can leave a partial last row; drop it so the
+    # next append starts on a fresh line.
+    with open(filename, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    
+    completed = set()
+    with open(filename, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            try:
+                completed.add((int(row['n_active']), int(row['sample_id']), row['policy']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return completed
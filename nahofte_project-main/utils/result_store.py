@@ -0,0 +1,336 @@
+import csv
+import json
+import os
+import numpy as np
+
+# Columnar result store: a directory of compressed .npz chunks plus a
+# manifest.json holding the column types and, per chunk, its row count and
+# min/max (numeric) or distinct values (categorical) of every column.
+# Strings are stored as categorical codes with a per-chunk category table,
+# ints as int64 and floats as float64. Per-row vectors (core activity, core
+# frequencies) go in "bits" columns, packed eight cores to a byte, or
+# "float32_vector" columns; these carry no statistics and cannot be used in
+# predicates. Readers use the manifest statistics to skip chunks that
+# cannot match a predicate and only decompress the columns they ask for.
+
+CHUNK_ROWS = 256
+MANIFEST = "manifest.json"
+
+# Column types of the rows main.py writes.
+RESULT_SCHEMA = {
+    "n_active": "int64",
+    "sample_id": "int64",
+    "policy": "category",
+    "throughput": "float64",
+    "rho": "float64",
+    "migrations": "int64",
+    "throughput_gain": "float64"
+}
+
+def _load_manifest(path):
+    manifest_file = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_file):
+        return {"version": 1, "columns": {}, "chunks": []}
+    with open(manifest_file) as f:
+        return json.load(f)
+
+def _save_manifest(path, manifest):
+    manifest_file = os.path.join(path, MANIFEST)
+    tmp = manifest_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_file)
+
+def is_result_store(path):
+    return os.path.isdir(path) or path.endswith(".results")
+
+def _column_type(value):
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int64"
+    if isinstance(value, (float, np.floating)):
+        return "float64"
+    if isinstance(value, str):
+        return "category"
+    raise TypeError(f"Unsupported result value {value!r} of type {type(value).__name__}")
+
+# Without an explicit schema, a column with ints and floats is a float column.
+def _infer_schema(rows):
+    schema = {}
+    for name in rows[0]:
+        kinds = {_column_type(row[name]) for row in rows if name in row}
+        schema[name] = "float64" if kinds == {"int64", "float64"} else kinds.pop()
+    return schema
+
+MISSING = {"bool": False, "int64": -1, "float64": np.nan, "category": ""}
+VECTOR_KINDS = ("bits", "float32_vector")
+
+# Appends rows to a store, writing a chunk every chunk_rows rows and on
+# flush()/close(). Each chunk is written to a temporary file and renamed
+# before the manifest is updated, so a killed sweep loses at most the rows
+# still buffered. The columns are fixed by `schema` or, failing that, by
+# the first chunk written; an existing store keeps its own. Rows may carry
+# extra keys (ignored) or miss scalar ones (stored as -1/NaN/""); vector
+# columns are required and must have the same length within a chunk.
+class ResultWriter:
+    def __init__(self, path, chunk_rows=CHUNK_ROWS, schema=None):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok=True)
+        self.manifest = _load_manifest(path)
+        if schema is not None and not self.manifest["columns"]:
+            self.manifest["columns"] = dict(schema)
+        self.buffer = []
+
+    def append(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        schema = self.manifest["columns"]
+        if not schema:
+            schema.update(_infer_schema(self.buffer))
+
+        arrays, stats = {}, {}
+        for name, kind in schema.items():
+            if kind in VECTOR_KINDS:
+                values = [row[name] for row in self.buffer]
+                if kind == "bits":
+                    bits = np.array(values, dtype=bool)
+                    arrays[name] = np.packbits(bits, axis=1)
+                    arrays[f"{name}__width"] = np.int64(bits.shape[1])
+                else:
+                    arrays[name] = np.array(values, dtype=np.float32)
+                stats[name] = None
+                continue
+
+            values = [row.get(name, MISSING[kind]) for row in self.buffer]
+            if kind == "category":
+                categories, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+                arrays[name] = codes.astype(np.int16 if len(categories) < 2**15 else np.int32)
+                arrays[f"{name}__categories"] = categories
+                stats[name] = categories.tolist()
+            else:
+                column = np.array(values, dtype=kind)
+                arrays[name] = column
+                if kind == "float64" and np.isnan(column).all():
+                    stats[name] = [None, None]
+                else:
+                    stats[name] = [np.nanmin(column).item(), np.nanmax(column).item()]
+
+        name = f"chunk_{len(self.manifest['chunks']):06d}.npz"
+        chunk_file = os.path.join(self.path, name)
+        with open(chunk_file + ".tmp", "wb") as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(chunk_file + ".tmp", chunk_file)
+
+        self.manifest["chunks"].append({"file": name, "rows": len(self.buffer), "stats": stats})
+        _save_manifest(self.path, self.manifest)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Predicates: {column: value} for equality, {column: (lo, hi)} for an
+# inclusive range, {column: [values]} (list or set) for membership.
+def _chunk_may_match(stats, kind, condition):
+    if kind == "category":
+        present = set(stats)
+        if isinstance(condition, (list, set, frozenset)):
+            return bool(present & set(condition))
+        return condition in present
+
+    lo, hi = stats
+    if lo is None:
+        return False
+    if isinstance(condition, tuple):
+        return condition[0] <= hi and condition[1] >= lo
+    if isinstance(condition, (list, set, frozenset)):
+        return any(lo <= v <= hi for v in condition)
+    return lo <= condition <= hi
+
+def _row_mask(column, condition):
+    if isinstance(condition, tuple):
+        return (column >= condition[0]) & (column <= condition[1])
+    if isinstance(condition, (list, set, frozenset)):
+        return np.isin(column, list(condition))
+    return column == condition
+
+def _decode(data, name, kind):
+    if kind == "category":
+        return data[f"{name}__categories"][data[name]]
+    if kind == "bits":
+        return np.unpackbits(data[name], axis=1, count=int(data[f"{name}__width"])).astype(np.int8)
+    return data[name]
+
+def _empty(kind):
+    if kind == "category":
+        return np.empty(0, dtype=str)
+    if kind == "bits":
+        return np.empty((0, 0), dtype=np.int8)
+    if kind == "float32_vector":
+        return np.empty((0, 0), dtype=np.float32)
+    return np.empty(0, dtype=kind)
+
+def read_schema(path):
+    return dict(_load_manifest(path)["columns"])
+
+# Reads `columns` (default: all) for the rows matching `where`, as a dict of
+# numpy arrays; categorical columns come back as string arrays and vector
+# columns as (rows, width) arrays, bits unpacked to 0/1 int8.
+def read_results(path, columns=None, where=None):
+    manifest = _load_manifest(path)
+    schema = manifest["columns"]
+    columns = list(schema) if columns is None else list(columns)
+    where = where or {}
+    for name in list(columns) + list(where):
+        if name not in schema:
+            raise KeyError(f"{path} has no column {name!r}")
+    for name in where:
+        if schema[name] in VECTOR_KINDS:
+            raise ValueError(f"Cannot filter on vector column {name!r}")
+
+    parts = {name: [] for name in columns}
+    for chunk in manifest["chunks"]:
+        if not all(_chunk_may_match(chunk["stats"][name], schema[name], condition)
+                   for name, condition in where.items()):
+            continue
+
+        with np.load(os.path.join(path, chunk["file"])) as data:
+            loaded = {name: _decode(data, name, schema[name]) for name in set(columns) | set(where)}
+        mask = np.ones(chunk["rows"], dtype=bool)
+        for name, condition in where.items():
+            mask &= _row_mask(loaded[name], condition)
+        for name in columns:
+            parts[name].append(loaded[name][mask])
+
+    result = {}
+    for name in columns:
+        if parts[name]:
+            result[name] = np.concatenate(parts[name])
+        else:
+            result[name] = _empty(schema[name])
+    return result
+
+def count_rows(path):
+    return sum(chunk["rows"] for chunk in _load_manifest(path)["chunks"])
+
+def completed_keys(path):
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return set()
+    keys = read_results(path, columns=["n_active", "sample_id", "policy"])
+    return set(zip(keys["n_active"].tolist(), keys["sample_id"].tolist(), keys["policy"].tolist()))
+
+# pandas view of a result CSV or store, with the same predicates; the
+# string columns of a store become pandas categoricals.
+def read_results_frame(path, columns=None, where=None):
+    import pandas as pd
+
+    if not is_result_store(path):
+        df = pd.read_csv(path, usecols=columns)
+        for name, condition in (where or {}).items():
+            df = df[_row_mask(df[name].to_numpy(), condition)]
+        return df.reset_index(drop=True)
+
+    schema = read_schema(path)
+    data = read_results(path, columns, where)
+    df = pd.DataFrame(data)
+    for name in df.columns:
+        if schema[name] == "category":
+            df[name] = df[name].astype("category")
+    return df
+
+# Side store next to a sweep's results holding, per (n_active, sample_id,
+# policy), the initial and final activity vectors and the final frequencies.
+STATE_SCHEMA = {
+    "n_active": "int64",
+    "sample_id": "int64",
+    "policy": "category",
+    "A0": "bits",
+    "A": "bits",
+    "F": "float32_vector"
+}
+
+def state_store_path(output_file):
+    return os.path.splitext(output_file.rstrip(os.sep))[0] + ".state"
+
+# Sweep parameters (seed and chip) recorded next to a sweep's results, so a
+# resumed run can tell whether the rows already there came from the same
+# sweep: result rows are keyed on (n_active, sample_id, policy) only. Inside
+# the directory for a result store, <output>.sweep.json for a CSV.
+SWEEP_KEYS = ("seed", "chip", "num_cores")
+
+def sweep_params_path(output_file):
+    if is_result_store(output_file):
+        return os.path.join(output_file, "sweep.json")
+    return os.path.splitext(output_file)[0] + ".sweep.json"
+
+def load_sweep_params(output_file):
+    path = sweep_params_path(output_file)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_sweep_params(output_file, params):
+    path = sweep_params_path(output_file)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(params, f, indent=1)
+
+# Raises ValueError if output_file was started with other sweep parameters;
+# records params if nothing is recorded yet.
+def check_sweep_params(output_file, params):
+    recorded = load_sweep_params(output_file)
+    if recorded is None:
+        save_sweep_params(output_file, params)
+        return
+    mismatched = [key for key in SWEEP_KEYS if recorded.get(key) != params.get(key)]
+    if mismatched:
+        details = ", ".join(f"{key}={recorded.get(key)!r} (now {params.get(key)!r})" for key in mismatched)
+        raise ValueError(f"{output_file} was started with {details}; use another output file")
+
+# The state of one result as {"A0", "A", "F"}, or None if it was not stored.
+# Only chunks whose statistics admit the key are decompressed.
+def load_state(path, n_active, sample_id, policy):
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+    found = read_results(path, columns=["A0", "A", "F"],
+                         where={"n_active": int(n_active), "sample_id": int(sample_id), "policy": policy})
+    if len(found["A"]) == 0:
+        return None
+    return {name: values[-1] for name, values in found.items()}
+
+def _parse(value):
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+def csv_to_store(csv_path, store_path, chunk_rows=CHUNK_ROWS):
+    rows = 0
+    with open(csv_path, newline="") as csvfile, ResultWriter(store_path, chunk_rows) as writer:
+        for row in csv.DictReader(csvfile):
+            writer.append({name: _parse(value) for name, value in row.items()})
+            rows += 1
+    return rows
@@ -1,9 +1,13 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from models.thermal_model import thermal_model
+from models.thermal import get_engine
 from models.core_info import PER_CORE
 
+# matplotlib and the thermal engine are only loaded once something is drawn.
+
 def visualize_thermal_matrix():
+    import matplotlib.pyplot as plt
+    
+    thermal_model = get_engine()
     B = thermal_model.get_thermal_matrix()
     
     plt.figure(figsize=(10, 8))
@@ -16,6 +20,9 @@ def visualize_thermal_matrix():
     plt.show()
 
 def visualize_core_temperatures(A, F):
+    import matplotlib.pyplot as plt
+    
+    thermal_model = get_engine()
     T = thermal_model.calculate_temperatures(A, F)
     
     grid = np.zeros((thermal_model.grid_h, thermal_model.grid_w))
@@ -38,6 +45,9 @@ def visualize_core_temperatures(A, F):
     plt.show()
 
 def visualize_core_relationships(core_id):
+    import matplotlib.pyplot as plt
+    
+    thermal_model = get_engine()
     relationships = thermal_model.get_core_relationships(core_id)
     
     print(f"Thermal relationships for core {core_id}:")
@@ -78,8 +88,9 @@ def visualize_core_relationships(core_id):
 if __name__ == "__main__":
     visualize_thermal_matrix()
     
-    A = [1 if i % 4 == 0 else 0 for i in range(thermal_model.num_cores)]
-    F = [0.5 * PER_CORE[i]["fmax"] for i in range(thermal_model.num_cores)]
+    num_cores = get_engine().num_cores
+    A = [1 if i % 4 == 0 else 0 for i in range(num_cores)]
+    F = [0.5 * PER_CORE[i]["fmax"] for i in range(num_cores)]
     
     visualize_core_temperatures(A, F)
     visualize_core_relationships(16)  # Show relationships for core 16
\ No newline at end of file
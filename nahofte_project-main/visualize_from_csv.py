@@ -1,13 +1,14 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from models.thermal_model import ThermalModel
-from models.core_info import PER_CORE
-import ast
+from models.chip import load_chip
+from models.thermal import get_engine
+from utils.result_store import read_results_frame, load_state, state_store_path, load_sweep_params
+
+# pandas comes in through read_results_frame and matplotlib inside the
+# plotting functions, so importing this module for its helpers stays cheap.
 
 def load_and_process_csv(csv_file):
     print(f"Loading data from: {csv_file}")
-    df = pd.read_csv(csv_file)
+    df = read_results_frame(csv_file)
     
     grouped = df.groupby(['n_active', 'policy']).agg({
         'throughput': 'mean',
@@ -19,6 +20,8 @@ def load_and_process_csv(csv_file):
     return df, grouped
 
 def visualize_policy_comparison(grouped_df):
+    import matplotlib.pyplot as plt
+    
     policies = grouped_df['policy'].unique()
     
     plt.figure(figsize=(12, 6))
@@ -49,7 +52,12 @@ def visualize_policy_comparison(grouped_df):
     plt.savefig('tspd_comparison.png', dpi=300)
     plt.show()
 
-def visualize_thermal_behavior_for_policy(thermal_model, n_active, policy_name, sample_df):
+# Draws the stored final mapping and frequencies of the first matching
+# sample, loaded from the sweep's state store. Sweeps that predate the state
+# store fall back to the first n_active cores at 0.7*fmax.
+def visualize_thermal_behavior_for_policy(thermal_model, n_active, policy_name, sample_df, state_path=None):
+    import matplotlib.pyplot as plt
+    
     policy_data = sample_df[(sample_df['policy'] == policy_name) &
                            (sample_df['n_active'] == n_active)]
     
@@ -59,9 +67,16 @@ def visualize_thermal_behavior_for_policy(thermal_model, n_active, policy_name,
     
     sample = policy_data.iloc[0]
     
-    A = [1] * n_active + [0] * (thermal_model.num_cores - n_active)
-    
-    F = [0.7 * PER_CORE[i]["fmax"] for i in range(thermal_model.num_cores)]
+    state = None
+    if state_path is not None:
+        state = load_state(state_path, n_active, sample['sample_id'], policy_name)
+    if state is not None:
+        A = state['A'].tolist()
+        F = state['F'].astype(float).tolist()
+    else:
+        print(f"No stored state for {policy_name} with {n_active} active cores; using a placeholder mapping")
+        A = [1] * n_active + [0] * (thermal_model.num_cores - n_active)
+        F = (0.7 * thermal_model.cores.fmax).tolist()
     
     T = thermal_model.calculate_temperatures(A, F)
     
@@ -95,10 +110,16 @@ def visualize_thermal_behavior_for_policy(thermal_model, n_active, policy_name,
     print(f"Minimum temperature: {min(T):.2f}°C")
     print(f"Average temperature: {np.mean(T):.2f}°C")
 
+# The chip a sweep ran on, from the parameters recorded with it; sweeps that
+# predate them ran on the default chip.
+def sweep_chip(output_file):
+    params = load_sweep_params(output_file) or {}
+    return load_chip(params.get("chip_path"))
+
 def main():
-    thermal_model = ThermalModel()
-    
     csv_file = 'results_policies7.csv'
+    thermal_model = get_engine(sweep_chip(csv_file))
+    
     sample_df, grouped_df = load_and_process_csv(csv_file)
     
     visualize_policy_comparison(grouped_df)
@@ -110,7 +131,7 @@ def main():
     n_active_to_visualize = 20  # Change to any value from 2 to 51
     
     visualize_thermal_behavior_for_policy(thermal_model, n_active_to_visualize,
-                                         policy_to_visualize, sample_df)
+                                         policy_to_visualize, sample_df, state_store_path(csv_file))
     
     core_id = 16
     relationships = thermal_model.get_core_relationships(core_id)